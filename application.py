@@ -3,10 +3,13 @@
 import logging
 import os
 import os.path
-import wx
-from inspect import isclass
+import sys
+from ast import Assign, Attribute, ClassDef, Name, literal_eval, parse
 from importlib import import_module, reload
+from inspect import isclass
 from time import time
+from weakref import WeakValueDictionary
+from attr import attrs, attrib, Factory
 from plugins.base import Plugin
 
 logger = logging.getLogger(__name__)
@@ -14,68 +17,199 @@ logger = logging.getLogger(__name__)
 name = 'MUDdle'
 __version__ = '0.0.1'
 
-app = wx.App()
-app.SetAppName(name)
-config_dir = wx.StandardPaths.Get().GetUserDataDir()
+
+def get_config_dir():
+    """Return the directory where user data is stored. This is the same
+    directory wx.StandardPaths.GetUserDataDir returns, but works without wx
+    so worlds can run without a display."""
+    if sys.platform.startswith('win'):
+        return os.path.join(os.environ['APPDATA'], name)
+    elif sys.platform == 'darwin':
+        return os.path.expanduser(
+            os.path.join('~', 'Library', 'Application Support', name)
+        )
+    else:
+        return os.path.expanduser(os.path.join('~', '.' + name))
+
+
+app = None  # Created by create_app.
+config_dir = get_config_dir()
 
 windows = []
 
+
+def create_app():
+    """Create the wx application. Only needed when running with a GUI."""
+    global app
+    import wx
+    app = wx.App()
+    app.SetAppName(name)
+    return app
+
+
 plugins_dir = 'plugins'
-plugin_modules = {}  # All the loaded plugin modules.
-plugins = set()
+plugin_modules = {}  # All the imported plugin modules.
+plugin_files = {}  # The modification times of plugin files when scanned.
+plugins = {}  # (module_name, class_name): PluginInfo.
 global_plugins = set()
+worlds = WeakValueDictionary()  # Every world, keyed by id.
+watcher = None  # The LoopingCall started by watch_plugins.
+
+
+@attrs
+class PluginInfo:
+    """
+    Information about a plugin, read from its source file.
+
+    The module containing the plugin is only imported when get_class is
+    called, so plugins nobody loads never import their dependencies.
+    """
+
+    module_name = attrib()
+    class_name = attrib()
+    name = attrib(default=Factory(lambda: Plugin.name))
+    description = attrib(default=Factory(lambda: Plugin.description))
+
+    def get_class(self):
+        """Return the plugin class, importing its module if necessary.
+        Returns None if the module cannot be imported."""
+        module = plugin_modules.get(self.module_name)
+        if module is None:
+            logger.info('Importing module %s.', self.module_name)
+            try:
+                module = import_module(self.module_name)
+            except Exception as e:
+                logger.warning(
+                    'Failed to import module %s:', self.module_name
+                )
+                logger.exception(e)
+                return None
+            plugin_modules[self.module_name] = module
+        cls = getattr(module, self.class_name, None)
+        if isclass(cls) and issubclass(cls, Plugin):
+            return cls
+        logger.warning(
+            'Module %s has no plugin named %s.',
+            self.module_name,
+            self.class_name
+        )
+
+
+def base_name(node):
+    """Return the name of the class referred to by the ast node."""
+    if isinstance(node, Attribute):
+        return node.attr
+    elif isinstance(node, Name):
+        return node.id
+
+
+def find_plugins(filename, module_name):
+    """Return a list of PluginInfo instances for the plugin classes defined
+    in filename, without importing it. Only classes which derive from Plugin,
+    or from another plugin class in the same file, are found."""
+    with open(filename, 'rb') as f:
+        tree = parse(f.read(), filename)
+    plugin_classes = {Plugin.__name__}
+    infos = []
+    for node in tree.body:
+        if not isinstance(node, ClassDef) or \
+                plugin_classes.isdisjoint(map(base_name, node.bases)):
+            continue
+        plugin_classes.add(node.name)
+        info = PluginInfo(module_name, node.name)
+        for item in node.body:
+            if isinstance(item, Assign) and len(item.targets) == 1 and \
+                    isinstance(item.targets[0], Name) and \
+                    item.targets[0].id in ('name', 'description'):
+                try:
+                    setattr(info, item.targets[0].id, literal_eval(item.value))
+                except ValueError:
+                    pass  # Not a literal.
+        infos.append(info)
+    return infos
+
+
+def reattach_plugins(module):
+    """Replace the instances of plugins from the reloaded module with
+    instances of the new classes, in every world."""
+    for world in list(worlds.values()):
+        changed = False
+        for index, plugin in reversed(list(enumerate(world.plugins))):
+            cls = type(plugin)
+            if cls.__module__ != module.__name__:
+                continue
+            changed = True
+            plugin.unloaded()
+            new_cls = getattr(module, cls.__name__, None)
+            if isclass(new_cls) and issubclass(new_cls, Plugin):
+                world.plugins[index] = new_cls(world)
+            else:
+                del world.plugins[index]
+                world.logger.info('Plugin %s no longer exists.', cls.name)
+        if changed:
+            world.update_hooks()
 
 
 def reload_plugins():
-    """Reload all available plugins."""
+    """Find the plugins in the plugins directory. Only files which have
+    changed since the last call are read, and modules which have already been
+    imported are reloaded, and their plugins reattached to worlds."""
     started = time()
-    for thing in [plugins, global_plugins]:
-        thing.clear()
-    for window in windows:
-        window.world.plugins.clear()
+    found = set()
     for filename in os.listdir(plugins_dir):
-        if filename == 'base.py':
-            continue  # Don't reload the base.py file.
         name, ext = os.path.splitext(filename)
-        if ext == '.py':
-            module_name = '{}.{}'.format(plugins_dir, name)
-            if module_name in plugin_modules:
-                action = 'Reload'
-                func = reload
-                arg = plugin_modules[module_name]
-                del plugin_modules[module_name]
-            else:
-                action = 'Load'
-                func = import_module
-                arg = module_name
+        if ext != '.py' or filename == 'base.py':
+            continue  # Don't reload the base.py file.
+        module_name = '{}.{}'.format(plugins_dir, name)
+        found.add(module_name)
+        path = os.path.join(plugins_dir, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue  # Deleted while scanning.
+        if plugin_files.get(module_name) == mtime:
+            continue
+        logger.debug('Scanning module %s.', module_name)
+        plugin_files[module_name] = mtime
+        for key in [key for key in plugins if key[0] == module_name]:
+            del plugins[key]
+        try:
+            infos = find_plugins(path, module_name)
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.warning('Failed to read %s:', path)
+            logger.exception(e)
+            infos = []
+        for info in infos:
+            plugins[(module_name, info.class_name)] = info
+            logger.debug('Found plugin %s.', info.name)
+        module = plugin_modules.get(module_name)
+        if module is not None:
+            logger.info('Reloading module %s.', module_name)
             try:
-                logger.info('%sing module %s.', action, module_name)
-                module = func(arg)
-                logger.debug('%s(%r) = %r.', func.__name__, arg, module)
-                plugin_modules[module_name] = module
+                module = reload(module)
             except Exception as e:
-                logger.warning('Failed to %s module %s:', action, module_name)
+                logger.warning('Failed to reload module %s:', module_name)
                 logger.exception(e)
-                module = None
-            if module is not None:  # Don't act on non-imported modules.
-                logger.info('Searching for plugins.')
-                for x in dir(module):
-                    cls = getattr(module, x)
-                    logger.debug('%s = %r.', x, cls)
-                    if isclass(cls) \
-                        and issubclass(cls, Plugin)\
-                            and cls is not Plugin:
-                        plugins.add(cls)
-                        logger.info('Found plugin %s.', cls.name)
-                    else:
-                        logger.info(
-                            'Ignoring attribute %s (%r, %r, %r).',
-                            x,
-                            isclass(cls),
-                            issubclass(cls, Plugin) if isclass(cls) else 'N/A',
-                            cls is not Plugin)
-        else:
-            logger.info('Ignoring file %s.', filename)
-    logger.info(
-        'Available plugins: %d (%.2f seconds).',
+            else:
+                plugin_modules[module_name] = module
+                reattach_plugins(module)
+    for module_name in set(plugin_files) - found:
+        logger.info('Module %s has been removed.', module_name)
+        del plugin_files[module_name]
+        for key in [key for key in plugins if key[0] == module_name]:
+            del plugins[key]
+    logger.debug(
+        'Available plugins: %d (%.3f seconds).',
         len(plugins), time() - started)
+
+
+def watch_plugins(interval=2.0):
+    """Check for changed plugins every interval seconds, reloading them
+    automatically. Must be called from the reactor thread."""
+    global watcher
+    from twisted.internet.task import LoopingCall
+    if watcher is not None:
+        watcher.stop()
+    watcher = LoopingCall(reload_plugins)
+    watcher.start(interval, now=False)
+    return watcher
@@ -0,0 +1,109 @@
+"""Load test MUDdle against a fake MUD server."""
+
+if __name__ == '__main__':
+    from default_argparse import parser
+    parser.add_argument(
+        '--worlds',
+        type=int,
+        default=10,
+        help='The number of worlds to connect'
+    )
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=30.0,
+        help='How long (in seconds) to run for'
+    )
+    parser.add_argument(
+        '--probe-interval',
+        type=float,
+        default=1.0,
+        help='How often (in seconds) each world times a round trip'
+    )
+    parser.add_argument(
+        '--hostname',
+        default='localhost',
+        help='The MUD to connect to, if --port is given'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        help='The port to connect to (if not given, a fake MUD is started)'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=10.0,
+        help='Lines per second sent by the fake MUD'
+    )
+    parser.add_argument(
+        '--burst',
+        type=int,
+        default=0,
+        help='Lines sent at once by the fake MUD every --burst-interval '
+        'seconds'
+    )
+    parser.add_argument(
+        '--burst-interval',
+        type=float,
+        default=5.0,
+        help='Seconds between bursts'
+    )
+    parser.add_argument(
+        '--no-ansi',
+        action='store_true',
+        help='Send plain text instead of ANSI-coloured lines'
+    )
+    parser.add_argument(
+        '--compression',
+        action='store_true',
+        help='Have the fake MUD offer MCCP compression'
+    )
+    parser.add_argument(
+        '--serve',
+        type=int,
+        metavar='PORT',
+        help='Only run the fake MUD, listening on this port'
+    )
+    args = parser.parse_args()
+    import logging
+    logging.basicConfig(
+        stream=args.log_file,
+        level=args.log_level,
+        format=args.log_format)
+    server_options = dict(
+        rate=args.rate,
+        burst=args.burst,
+        burst_interval=args.burst_interval,
+        ansi=not args.no_ansi,
+        compression=args.compression
+    )
+    if args.serve is not None:
+        from twisted.internet import reactor
+        from muddle.fake_server import FakeMudFactory
+        reactor.listenTCP(args.serve, FakeMudFactory(**server_options))
+        logging.info('Fake MUD listening on port %d.', args.serve)
+        reactor.run()
+        raise SystemExit
+    import application
+    from muddle.load_test import run
+    application.reload_plugins()
+    results = run(
+        worlds=args.worlds,
+        duration=args.duration,
+        probe_interval=args.probe_interval,
+        hostname=args.hostname,
+        port=args.port,
+        **server_options
+    )
+    print(
+        '{connected} of {worlds} worlds connected. {lines} lines in '
+        '{seconds:.1f} seconds ({lines_per_second:.0f} per second). '
+        '{probes} probes, {lost} lost, p50 {p50_ms:.2f} ms, p99 {p99_ms:.2f} '
+        'ms, max {max_ms:.2f} ms.'.format(
+            p50_ms=results['p50'] * 1000,
+            p99_ms=results['p99'] * 1000,
+            max_ms=results['max'] * 1000,
+            **results
+        )
+    )
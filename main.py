@@ -3,10 +3,34 @@
 if __name__ == '__main__':
     from default_argparse import parser
     parser.add_argument(
-        'world',
+        'worlds',
         metavar='WORLD-FILE',
-        nargs='?',
-        help='The world file to load into the first window'
+        nargs='*',
+        help='The world files to load, one per window'
+    )
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='Run the worlds without a GUI'
+    )
+    parser.add_argument(
+        '--shards',
+        type=int,
+        default=0,
+        help='When running headless, split the worlds between this many '
+        'worker processes'
+    )
+    parser.add_argument(
+        '--report-interval',
+        type=float,
+        default=60.0,
+        help='How often (in seconds) to report the resources used by each '
+        'world when running headless (0 to disable)'
+    )
+    parser.add_argument(
+        '--watch-plugins',
+        action='store_true',
+        help='Reload plugins automatically when their files change'
     )
     args = parser.parse_args()
     import logging
@@ -22,10 +46,28 @@ if __name__ == '__main__':
     )
     from twisted.internet import reactor
     application.reload_plugins()
+    if args.watch_plugins:
+        reactor.callWhenRunning(application.watch_plugins)
+    if args.headless and args.shards:
+        from muddle.shards import run
+        run(
+            args.worlds,
+            shards=args.shards,
+            report_interval=args.report_interval
+        )
+        logging.info('Done.')
+        raise SystemExit
+    elif args.headless:
+        from muddle.headless import run
+        run(args.worlds, report_interval=args.report_interval)
+        logging.info('Done.')
+        raise SystemExit
+    application.create_app()
     from muddle.gui.main_frame import MainFrame
     from threading import Thread
     Thread(target=reactor.run, args=[False]).start()
-    frame = MainFrame(filename=args.world)
+    for filename in args.worlds or [None]:
+        MainFrame(filename=filename)
     application.app.MainLoop()
     reactor.callFromThread(reactor.stop)
     for window in application.windows:
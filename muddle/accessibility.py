@@ -1,5 +1,133 @@
 """Accessibility system."""
 
+from collections import deque
+from threading import Condition, Thread
+from time import monotonic
+from attr import attrs, attrib, Factory
 from accessible_output2.outputs.auto import Auto
 
 system = Auto()
+
+
+@attrs
+class SpeechQueue:
+    """
+    Speaks text in a worker thread, so callers never wait for the speech
+    system.
+
+    Texts queued while the last utterance was being spoken are joined into
+    one utterance, up to max_length characters. Texts with higher priorities
+    are spoken first. When more than max_items texts are waiting, the oldest
+    text with the lowest priority is dropped, and the next utterance starts
+    by saying how many were skipped.
+
+    Speech systems queue what they are given and return at once, so after
+    each utterance the queue waits for roughly as long as it takes to say,
+    assuming chars_per_second characters are spoken each second, and at
+    least interval seconds. Texts which arrive faster than that pile up here,
+    where they are merged or dropped, instead of in the speech system.
+    """
+
+    output = attrib(default=Factory(lambda: system))
+    max_items = attrib(default=Factory(lambda: 50))
+    max_length = attrib(default=Factory(lambda: 500))
+    interval = attrib(default=Factory(lambda: 0.1))
+    chars_per_second = attrib(default=Factory(lambda: 15.0))
+    items = attrib(default=Factory(deque), init=False)
+    skipped = attrib(default=Factory(int), init=False)
+    dropped = attrib(default=Factory(int), init=False)
+    spoken = attrib(default=Factory(int), init=False)
+    _silence = attrib(default=Factory(bool), init=False)
+    _condition = attrib(default=Factory(Condition), init=False)
+    _thread = attrib(default=Factory(lambda: None), init=False)
+
+    def put(self, text, priority=0):
+        """Queue text to be spoken."""
+        self.extend([text], priority=priority)
+
+    def extend(self, texts, priority=0):
+        """Queue several texts to be spoken, taking the lock once."""
+        with self._condition:
+            if self._thread is None:
+                self._thread = Thread(
+                    target=self.run, name='Speech', daemon=True
+                )
+                self._thread.start()
+            items = self.items
+            for text in texts:
+                if len(items) >= self.max_items:
+                    # min returns the oldest of the lowest priority items.
+                    index = min(
+                        range(len(items)), key=lambda i: items[i][0]
+                    )
+                    self.skipped += 1
+                    self.dropped += 1
+                    if items[index][0] > priority:
+                        continue  # Drop this text instead.
+                    del items[index]
+                items.append((priority, text))
+            self._condition.notify()
+
+    def interrupt(self):
+        """Forget every queued text, and silence the speech system."""
+        with self._condition:
+            self.items.clear()
+            self.skipped = 0
+            self._silence = True
+            self._condition.notify()
+
+    def next_utterance(self):
+        """Remove the next utterance from the queue, and return it. Must be
+        called with the lock held."""
+        items = self.items
+        priority = max(item[0] for item in items)
+        texts = []
+        length = 0
+        full = False
+        remaining = deque()
+        for item in items:
+            if item[0] == priority and not full:
+                if texts and length + len(item[1]) > self.max_length:
+                    full = True
+                else:
+                    texts.append(item[1])
+                    length += len(item[1])
+                    continue
+            remaining.append(item)
+        self.items = remaining
+        if self.skipped:
+            texts.insert(0, '{} lines skipped.'.format(self.skipped))
+            self.skipped = 0
+        return '\n'.join(texts)
+
+    def run(self):
+        """Speak queued texts until the program exits."""
+        while True:
+            with self._condition:
+                while not self.items and not self._silence:
+                    self._condition.wait()
+                silence = self._silence
+                self._silence = False
+                text = self.next_utterance() if self.items else None
+            if silence:
+                self.output.speak('', interrupt=True)
+            if text is not None:
+                self.output.speak(text)
+                self.spoken += 1
+                self.wait(
+                    max(self.interval, len(text) / self.chars_per_second)
+                )
+
+    def wait(self, seconds):
+        """Wait for seconds while the last utterance is spoken, or until
+        interrupt is called."""
+        deadline = monotonic() + seconds
+        with self._condition:
+            while not self._silence:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+
+speech_queue = SpeechQueue()
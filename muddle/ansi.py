@@ -0,0 +1,56 @@
+"""ANSI escape sequence parsing."""
+
+import re
+
+escape = chr(27)
+# Control sequences (escape, [, parameters, intermediate bytes and a final
+# byte), and two character escape sequences.
+sequence_re = re.compile(r'\x1b(?:\[([0-?]*)[ -/]*([@-~])|[0-Z\\-_])')
+
+
+def parse_parameters(parameters):
+    """Return the numeric parameters of a select graphic rendition sequence
+    as a tuple. An empty parameter means 0."""
+    values = []
+    for parameter in parameters.split(';'):
+        try:
+            values.append(int(parameter or 0))
+        except ValueError:
+            pass  # Private or colon-separated parameters.
+    return tuple(values)
+
+
+def parse(text):
+    """
+    Return (plain, styles) for text.
+
+    plain is text with every escape sequence removed. styles is a tuple of
+    (offset, parameters) pairs, one for each select graphic rendition
+    sequence, where offset is the position in plain at which the sequence
+    took effect, and parameters is a tuple of integers.
+
+    Text should be a complete line, so sequences which were split across
+    reads from the server have already been joined back together.
+    """
+    if escape not in text:
+        return text, ()
+    plain = []
+    styles = []
+    length = 0
+    position = 0
+    for m in sequence_re.finditer(text):
+        chunk = text[position:m.start()]
+        plain.append(chunk)
+        length += len(chunk)
+        position = m.end()
+        if m.group(2) == 'm':
+            styles.append((length, parse_parameters(m.group(1))))
+    plain.append(text[position:])
+    return ''.join(plain), tuple(styles)
+
+
+def strip(text):
+    """Return text with every escape sequence removed."""
+    if escape not in text:
+        return text
+    return sequence_re.sub('', text)
@@ -1,8 +1,20 @@
 """World configuration."""
 
+import codecs
 from simpleconf import Section, Option, validators
 
 
+def encoding_validator(option, value):
+    """Make sure value is the name of a character encoding Python knows."""
+    try:
+        codecs.lookup(value)
+    except LookupError:
+        raise validators.ValidationError(
+            'Unknown character encoding: %r.' % value
+        )
+    return value
+
+
 class Config(Section):
     """World configuration."""
     class world(Section):
@@ -17,7 +29,15 @@ class Config(Section):
         autosave = Option(
             True, title='&Autosave on exit',
             validator=validators.Boolean)
-        option_order = [name, description, autosave]
+        save_statistics = Option(
+            False, title='Save trigger &statistics',
+            validator=validators.Boolean)
+        database = Option(
+            False,
+            title='Store triggers and aliases in a &database (faster saving '
+            'for large worlds)',
+            validator=validators.Boolean)
+        option_order = [name, description, autosave, save_statistics, database]
 
     class connection(Section):
         """Connection information."""
@@ -29,7 +49,15 @@ class Config(Section):
             7777,
             title='&Port',
             validator=validators.Integer(min=1, max=65535))
-        option_order = [hostname, port]
+        compression = Option(
+            True,
+            title='Use &compression if the server supports it',
+            validator=validators.Boolean)
+        encoding = Option(
+            'utf-8',
+            title='Character &encoding',
+            validator=encoding_validator)
+        option_order = [hostname, port, compression, encoding]
 
     class entry(Section):
         """Entry configuration."""
@@ -41,7 +69,61 @@ class Config(Section):
                 min=0.0))
         option_order = [command_interval]
 
+    class output(Section):
+        """Output configuration."""
+        title = 'Output'
+        flush_interval = Option(
+            1 / 30,
+            title='&Seconds between output updates',
+            validator=validators.Float(min=0.001))
+        max_batch = Option(
+            500,
+            title='&Maximum lines to add in one update',
+            validator=validators.Integer(min=1))
+        scrollback_lines = Option(
+            100000,
+            title='&Lines of scrollback to keep',
+            validator=validators.Integer(min=1))
+        visible_lines = Option(
+            2000,
+            title='Lines to &show in the output window',
+            validator=validators.Integer(min=1))
+        option_order = [
+            flush_interval, max_batch, scrollback_lines, visible_lines]
+
+    class plugins(Section):
+        """Plugin configuration."""
+        title = 'Plugins'
+        slow_call = Option(
+            0.05,
+            title='&Warn about plugin calls slower than this many seconds '
+            'while profiling (0 to disable)',
+            validator=validators.Float(min=0.0))
+        option_order = [slow_call]
+
+    class speech(Section):
+        """Speech configuration."""
+        title = 'Speech'
+        priority = Option(
+            0,
+            title='Speech &priority (lines from worlds with higher priorities '
+            'are spoken first)',
+            validator=validators.Integer())
+        interrupt = Option(
+            True,
+            title='&Interrupt speech when a command is entered',
+            validator=validators.Boolean)
+        chars_per_second = Option(
+            15.0,
+            title='&Characters your speech system speaks each second (lines '
+            'arriving faster than this are merged or skipped)',
+            validator=validators.Float(min=1.0))
+        option_order = [priority, interrupt, chars_per_second]
+
     section_order = [
         world,
         connection,
-        entry]
+        entry,
+        output,
+        plugins,
+        speech]
@@ -0,0 +1,138 @@
+"""A fake MUD server, for load and latency testing."""
+
+import random
+import zlib
+from attr import attrs, attrib, Factory
+from twisted.internet.protocol import ServerFactory
+from twisted.internet.task import LoopingCall
+from twisted.protocols.basic import LineReceiver
+from .telnet import IAC, WILL, DO, SB, SE, MCCP2
+
+escape = chr(27)
+colours = list(range(30, 38))
+words = (
+    'the orc hits you with a rusty sword for damage you parry dodge miss '
+    'gold coins fall to the ground a goblin arrives from the north'
+).split()
+do_mccp2 = bytes([IAC, DO, MCCP2])
+
+
+def random_line(ansi=True):
+    """Return a line of random text, coloured with ANSI codes if ansi is
+    True."""
+    chosen = random.sample(words, random.randint(3, 10))
+    if ansi:
+        chosen = [
+            '{}[{};{}m{}{}[0m'.format(
+                escape, random.randint(0, 1), random.choice(colours), word,
+                escape
+            ) for word in chosen
+        ]
+    return ' '.join(chosen)
+
+
+class FakeMudProtocol(LineReceiver):
+    """
+    A connection to the fake MUD.
+
+    Commands are echoed back. "echo <text>" sends back just the text, so
+    clients can time round trips.
+    """
+
+    def connectionMade(self):
+        """Greet the client."""
+        self.compressor = None
+        self.factory.clients.append(self)
+        if self.factory.compression:
+            self.transport.write(bytes([IAC, WILL, MCCP2]))
+        self.sendLine(b'Welcome to the fake MUD.')
+
+    def connectionLost(self, reason):
+        """Forget the client."""
+        self.factory.clients.remove(self)
+
+    def dataReceived(self, data):
+        """Start compressing if the client agreed to MCCP2."""
+        if do_mccp2 in data:
+            data = data.replace(do_mccp2, b'')
+            if self.compressor is None:
+                self.transport.write(bytes([IAC, SB, MCCP2, IAC, SE]))
+                self.compressor = zlib.compressobj()
+        super().dataReceived(data)
+
+    def lineReceived(self, line):
+        """Echo the command back."""
+        command = line.decode(errors='replace')
+        if command.startswith('echo '):
+            self.sendLine(command[5:].encode())
+        else:
+            self.sendLine('You said: {}'.format(command).encode())
+
+    def sendLines(self, lines):
+        """Send several lines in one write."""
+        self.write(b''.join(line + self.delimiter for line in lines))
+
+    def sendLine(self, line):
+        """Send a line."""
+        self.write(line + self.delimiter)
+
+    def write(self, data):
+        """Write data, compressing it if MCCP2 is active."""
+        if self.compressor is not None:
+            data = self.compressor.compress(data) + self.compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+        self.transport.write(data)
+
+
+@attrs
+class FakeMudFactory(ServerFactory):
+    """
+    Builds fake MUD connections, and sends them random output.
+
+    rate - Lines per second sent to every client.
+    burst - Lines sent at once every burst_interval seconds (0 for none).
+    ansi - Whether to colour lines with ANSI codes.
+    compression - Whether to offer MCCP2.
+    """
+
+    rate = attrib(default=Factory(lambda: 10.0))
+    burst = attrib(default=Factory(int))
+    burst_interval = attrib(default=Factory(lambda: 5.0))
+    ansi = attrib(default=Factory(lambda: True))
+    compression = attrib(default=Factory(bool))
+    tick = attrib(default=Factory(lambda: 0.05))
+    clients = attrib(default=Factory(list), init=False)
+    loops = attrib(default=Factory(list), init=False)
+    _owed = attrib(default=Factory(float), init=False)
+    protocol = FakeMudProtocol
+
+    def startFactory(self):
+        """Start sending output."""
+        if self.rate:
+            self.loops.append(LoopingCall(self.send_output))
+            self.loops[-1].start(self.tick, now=False)
+        if self.burst:
+            self.loops.append(LoopingCall(self.send_lines, self.burst))
+            self.loops[-1].start(self.burst_interval, now=False)
+
+    def stopFactory(self):
+        """Stop sending output."""
+        for loop in self.loops:
+            loop.stop()
+        self.loops.clear()
+
+    def send_output(self):
+        """Send each client the lines owed since the last tick."""
+        self._owed += self.rate * self.tick
+        count = int(self._owed)
+        self._owed -= count
+        if count:
+            self.send_lines(count)
+
+    def send_lines(self, count):
+        """Send count random lines to every client."""
+        for client in self.clients:
+            client.sendLines(
+                [random_line(ansi=self.ansi).encode() for i in range(count)]
+            )
@@ -2,11 +2,16 @@
 
 import logging
 import wx
+from json import dump
+from collections import deque
+from time import strftime, localtime
+from wx.lib.dialogs import ScrolledMessageDialog
 from simpleconf.dialogs.wx import SimpleConfWxDialog
 import application
 from ..line import Line
 from ..world import World, world_dir
 from twisted.internet import reactor
+from twisted.internet.threads import blockingCallFromThread
 
 logger = logging.getLogger(__name__)
 
@@ -60,8 +65,55 @@ class MainFrame(wx.Frame):
             self.do_load,
             id=wx.ID_OPEN
         )
+        self.add_menu_item(self.world_menu, '&Find...\tCtrl+F', self.do_find)
+        self.add_menu_item(
+            self.world_menu,
+            'Find &Next\tF3',
+            lambda event: self.find_again()
+        )
+        self.add_menu_item(
+            self.world_menu,
+            'Find Pre&vious\tShift+F3',
+            lambda event: self.find_again(backwards=True)
+        )
         self.add_menu_item(self.world_menu, '&Connect', self.do_connect)
         self.add_menu_item(self.world_menu, '&Disconnect', self.do_disconnect)
+        self.add_menu_item(
+            self.world_menu,
+            'Start &Recording...',
+            self.do_record
+        )
+        self.add_menu_item(
+            self.world_menu,
+            'S&top Recording',
+            lambda event: reactor.callFromThread(self.world.stop_recording)
+        )
+        self.add_menu_item(
+            self.world_menu,
+            'Send &Queued Commands',
+            lambda event: self.world.flush_commands()
+        )
+        self.add_menu_item(
+            self.world_menu,
+            'C&ancel Queued Commands',
+            lambda event: self.world.cancel_commands()
+        )
+        self.add_menu_item(
+            self.world_menu,
+            '&Profile Triggers',
+            self.do_profile,
+            kind=wx.ITEM_CHECK
+        )
+        self.add_menu_item(
+            self.world_menu,
+            'Trigger &Statistics...',
+            self.do_statistics
+        )
+        self.add_menu_item(
+            self.world_menu,
+            'R&eset Trigger Statistics',
+            lambda event: self.world.reset_statistics()
+        )
         self.plugins_menu = wx.Menu()
         self.add_menu_item(
             self.plugins_menu,
@@ -78,6 +130,27 @@ class MainFrame(wx.Frame):
             '&Reload',
             lambda event: application.reload_plugins()
         )
+        self.add_menu_item(
+            self.plugins_menu,
+            '&Profile Plugins',
+            self.do_profile_plugins,
+            kind=wx.ITEM_CHECK
+        )
+        self.add_menu_item(
+            self.plugins_menu,
+            'Plugin &Statistics...',
+            self.do_plugin_statistics
+        )
+        self.add_menu_item(
+            self.plugins_menu,
+            '&Export Plugin Statistics...',
+            self.do_export_plugin_statistics
+        )
+        self.add_menu_item(
+            self.plugins_menu,
+            'R&eset Plugin Statistics',
+            lambda event: self.world.reset_plugin_statistics()
+        )
         self.preferences_menu = wx.Menu()
         for section in self.world.config.section_order:
             self.add_menu_item(
@@ -94,6 +167,17 @@ class MainFrame(wx.Frame):
         self.menubar.Append(self.world_menu, '&World')
         self.menubar.Append(self.plugins_menu, '&Plugins')
         self.SetMenuBar(self.menubar)
+        self.CreateStatusBar()
+        self.output_buffer = deque()
+        self.output_lines = 0
+        self.search_text = ''
+        self.search_position = None
+        self.flush_pending = False
+        self.flush_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.flush_output, self.flush_timer)
+        self.flush_interval = None
+        self.max_batch = self.world.config.output['max_batch']
+        self.start_flush_timer()
         self.Show(True)
         self.Maximize()
         if filename is not None:
@@ -102,25 +186,126 @@ class MainFrame(wx.Frame):
     def on_close(self, event):
         """Window is about to close."""
         event.Skip()
+        self.flush_timer.Stop()
         if self.world.connected:
             reactor.callFromThread(
                 self.world.protocol.transport.loseConnection
             )
 
     def write(self, text):
-        """Write some text to the output window."""
-        def f(text):
-            try:
-                self.output.AppendText(text + '\n')
-            except Exception as e:
-                logger.exception(e)
-        wx.CallAfter(f, text)
+        """Write some text to the output window. Safe to call from any
+        thread, the text is added the next time the output is flushed."""
+        self.output_buffer.append(text)
+        if len(self.output_buffer) >= self.max_batch \
+                and not self.flush_pending:
+            self.flush_pending = True
+            wx.CallAfter(self.flush_output)
 
-    def add_menu_item(self, menu, name, handler, description='', id=None):
+    def set_status(self, text):
+        """Show text in the status bar. Safe to call from any thread."""
+        wx.CallAfter(self.SetStatusText, text)
+
+    def start_flush_timer(self):
+        """(Re)start the timer which flushes the output, if the configured
+        interval has changed."""
+        interval = self.world.config.output['flush_interval']
+        if interval != self.flush_interval:
+            self.flush_interval = interval
+            self.flush_timer.Start(max(1, int(interval * 1000)))
+
+    def flush_output(self, event=None):
+        """Add buffered text to the output window, at most max_batch items
+        at a time."""
+        self.flush_pending = False
+        self.max_batch = self.world.config.output['max_batch']
+        if event is not None:
+            self.start_flush_timer()
+        buffer = self.output_buffer
+        texts = []
+        while buffer and len(texts) < self.max_batch:
+            texts.append(buffer.popleft())
+        if not texts:
+            return
+        text = '\n'.join(texts) + '\n'
+        try:
+            self.output.AppendText(text)
+            self.output_lines += text.count('\n')
+            self.trim_output()
+        except Exception as e:
+            logger.exception(e)
+        if buffer and not self.flush_pending:
+            # Let other events through before adding the rest.
+            self.flush_pending = True
+            wx.CallAfter(self.flush_output)
+
+    def trim_output(self):
+        """Remove old lines from the output window, so it only shows the most
+        recent part of the scrollback."""
+        visible = self.world.config.output['visible_lines']
+        # Trim in chunks, so lines aren't removed on every flush.
+        excess = self.output_lines - visible
+        if excess > visible // 10:
+            self.output.Remove(0, self.output.XYToPosition(0, excess))
+            self.output_lines -= excess
+
+    def do_find(self, event):
+        """Search the scrollback for some text."""
+        dlg = wx.TextEntryDialog(
+            self,
+            'Enter the text to search for',
+            'Find',
+            self.search_text
+        )
+        if dlg.ShowModal() == wx.ID_OK:
+            self.search_text = dlg.GetValue()
+            self.search_position = None
+            self.find_again(backwards=True)
+        dlg.Destroy()
+
+    def find_again(self, backwards=False):
+        """Find the next (or previous) line containing the search text."""
+        if not self.search_text:
+            return self.do_error('You have not searched for anything yet.')
+        scrollback = self.world.scrollback
+
+        def find():
+            """Search on the reactor thread, which adds lines to the
+            scrollback."""
+            number = scrollback.find(
+                self.search_text,
+                start=self.search_position,
+                backwards=backwards
+            )
+            if number is None:
+                return None
+            return (number, scrollback.first, len(scrollback)) + \
+                scrollback.get(number)
+
+        result = blockingCallFromThread(reactor, find)
+        if result is None:
+            return self.do_error(
+                'No more lines contain %r.' % self.search_text, title='Find'
+            )
+        number, first, length, timestamp, text = result
+        self.search_position = number
+        wx.MessageBox(
+            text,
+            'Line {} of {} ({})'.format(
+                number - first + 1,
+                length,
+                strftime('%Y-%m-%d %H:%M:%S', localtime(timestamp))
+            ),
+            style=wx.ICON_INFORMATION
+        )
+
+    def add_menu_item(
+        self, menu, name, handler, description='', id=None,
+        kind=wx.ITEM_NORMAL
+    ):
         """Add a new item to menu, binding in the process."""
         if id is None:
             id = wx.NewId()
-        item = menu.Append(id, name, description)
+        item = menu.Append(id, name, description, kind)
         self.Bind(wx.EVT_MENU, handler, item)
 
     def do_error(self, message, title='Error', style=wx.ICON_EXCLAMATION):
@@ -145,6 +330,19 @@ class MainFrame(wx.Frame):
             except Exception as e:
                 self.do_error(e)
 
+    def do_record(self, event):
+        """Start recording this world."""
+        dlg = wx.FileDialog(
+            self,
+            defaultDir=world_dir,
+            wildcard='*.recording',
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dlg.ShowModal() == wx.ID_OK:
+            reactor.callFromThread(
+                self.world.start_recording, dlg.GetPath()
+            )
+        dlg.Destroy()
+
     def do_connect(self, event):
         """Connect the world."""
         def f():
@@ -165,21 +363,66 @@ class MainFrame(wx.Frame):
                 wx.CallAfter(self.do_error, e)
         reactor.callFromThread(f)
 
+    def do_profile(self, event):
+        """Turn trigger profiling on or off."""
+        self.world.profiling = event.IsChecked()
+
+    def do_statistics(self, event):
+        """Show the triggers and aliases which have taken the most time."""
+        report = self.world.statistics_report(count=50)
+        if not self.world.profiling:
+            report = 'Profiling is turned off.\n\n' + report
+        dlg = ScrolledMessageDialog(self, report, 'Trigger Statistics')
+        dlg.ShowModal()
+        dlg.Destroy()
+
+    def do_profile_plugins(self, event):
+        """Turn plugin profiling on or off."""
+        self.world.plugin_profiling = event.IsChecked()
+
+    def do_plugin_statistics(self, event):
+        """Show the plugin hooks which have taken the most time."""
+        report = self.world.plugin_statistics_report()
+        if not self.world.plugin_profiling:
+            report = 'Profiling is turned off.\n\n' + report
+        dlg = ScrolledMessageDialog(self, report, 'Plugin Statistics')
+        dlg.ShowModal()
+        dlg.Destroy()
+
+    def do_export_plugin_statistics(self, event):
+        """Save plugin statistics as JSON."""
+        dlg = wx.FileDialog(
+            self,
+            defaultDir=world_dir,
+            wildcard='*.json',
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dlg.ShowModal() == wx.ID_OK:
+            try:
+                with open(dlg.GetPath(), 'w') as f:
+                    dump(self.world.dump_plugin_statistics(), f, indent=4)
+            except Exception as e:
+                self.do_error(e)
+        dlg.Destroy()
+
     def load_plugins(self, worlds):
         """Load a plugin to 1 or more worlds."""
-        plugins = sorted(application.plugins, key=lambda plugin: plugin.name)
+        plugins = sorted(
+            application.plugins.values(), key=lambda info: info.name
+        )
         dlg = wx.MultiChoiceDialog(
             self,
             'Select plugins to load',
             'Plugins',
-            ['{}: {}'.format(cls.name, cls.description) for cls in plugins])
+            ['{}: {}'.format(info.name, info.description) for info in plugins])
         if dlg.ShowModal() == wx.ID_OK:
             indexes = dlg.GetSelections()
         else:
             indexes = []
         dlg.Destroy()
         for index in indexes:
-            cls = plugins[index]
+            cls = plugins[index].get_class()
+            if cls is None:
+                continue  # The failure has been logged.
             for world in worlds:
                 world.load_plugin(cls)
 
@@ -200,16 +443,8 @@ class MainFrame(wx.Frame):
             self.world.handle_plugins('command_entered', line)
             if line.gagged():
                 return  # Go no further.
-            for alias in self.world.aliases:
-                m = alias.match(line)
-                if m:
-                    if m is True:
-                        args = []
-                        kwargs = {}
-                    else:
-                        args = m.groups()
-                        kwargs = m.groupdict()
-                    alias.run(line, *args, **kwargs)
+            for alias, args, kwargs in self.world.alias_set.matches(line):
+                alias.run(line, *args, **kwargs)
             self.world.handle_plugins('pre_send', line)
             if not line.gagged() and self.world.connected:
                 self.world.send(line.get_text())
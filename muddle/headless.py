@@ -0,0 +1,144 @@
+"""Run worlds without a GUI."""
+
+import logging
+import sys
+from attr import attrs, attrib, Factory
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from .world import World, logger as world_logger
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+@attrs
+class NullOutput:
+    """Used in place of a frame by worlds without a window. Text written to
+    it is counted, then thrown away. Subclass it to do something with the
+    text."""
+
+    world = attrib(default=Factory(lambda: None))
+    writes = attrib(default=Factory(int), init=False)
+
+    def write(self, text):
+        """Count text."""
+        self.writes += 1
+
+    def SetTitle(self, title):
+        """Worlds call this when they are renamed."""
+        pass
+
+    def set_status(self, text):
+        """Plugins call this to show status text, such as the current
+        lag."""
+        pass
+
+
+class Output(NullOutput):
+    """Logs text with the name of its world."""
+
+    def write(self, text):
+        """Log text."""
+        name = self.world.name if self.world is not None else None
+        logger.info('%s: %s', name or 'Untitled World', text)
+
+    def set_status(self, text):
+        """Log status text."""
+        name = self.world.name if self.world is not None else None
+        logger.debug('%s status: %s', name or 'Untitled World', text)
+
+
+@attrs
+class PipeOutput(NullOutput):
+    """Used by worlds in a shard (see shards.py). Sends text to the parent
+    process over connection."""
+
+    connection = attrib(kw_only=True)
+
+    def write(self, text):
+        """Send text to the parent."""
+        self.connection.send(('output', self.world.name, text))
+
+
+def create_world(filename=None, output=None):
+    """Return a new world with no window, loaded from filename if given.
+    Text is written to output, which defaults to a new Output instance."""
+    if output is None:
+        output = Output()
+    # Messages logged by worlds reach their outputs, so should not also reach
+    # the root logger.
+    world_logger.propagate = False
+    world = World(output)
+    output.world = world
+    if filename is not None:
+        world.load(filename)
+    return world
+
+
+def usage(world):
+    """Return (cpu_time, scrollback_bytes) for world."""
+    return (
+        world.cpu_time,
+        sum(sys.getsizeof(text) for timestamp, text in world.scrollback)
+    )
+
+
+def report(worlds):
+    """Log the resources used by each world."""
+    for world in worlds:
+        cpu_time, scrollback_bytes = usage(world)
+        logger.info(
+            'World %s: %s, %.3f seconds of CPU time, %d lines (%d bytes) of '
+            'scrollback, %d triggers, %d aliases.',
+            world.name,
+            'connected' if world.connected else 'disconnected',
+            cpu_time,
+            len(world.scrollback),
+            scrollback_bytes,
+            len(world.triggers),
+            len(world.aliases)
+        )
+    if resource is not None:
+        logger.info(
+            'Maximum resident set size: %d KB.',
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        )
+
+
+def load_worlds(filenames, output_factory=Output):
+    """Return a list of worlds loaded from filenames, skipping any which
+    fail to load. Each world writes to the result of output_factory()."""
+    worlds = []
+    for filename in filenames:
+        try:
+            worlds.append(create_world(filename, output=output_factory()))
+        except Exception as e:
+            logger.warning('Failed to load world %s:', filename)
+            logger.exception(e)
+    return worlds
+
+
+def save_worlds(worlds):
+    """Save every world which has a name."""
+    for world in worlds:
+        if world.name:
+            logger.info('Saving world %s.', world.name)
+            world.save()
+
+
+def run(filenames, report_interval=60.0):
+    """Load every world in filenames, and run until the reactor stops.
+    Resources are reported every report_interval seconds (if it is not 0),
+    and worlds with names are saved on exit."""
+    worlds = load_worlds(filenames)
+    logger.info('Running %d world(s).', len(worlds))
+    if report_interval:
+        LoopingCall(report, worlds).start(report_interval, now=False)
+    reactor.run()
+    report(worlds)
+    save_worlds(worlds)
+    return worlds
@@ -0,0 +1,69 @@
+"""Histograms of durations."""
+
+from attr import attrs, attrib, Factory
+
+bucket_count = 32
+
+
+@attrs
+class Histogram:
+    """
+    Durations, counted in buckets which double in size.
+
+    Bucket 0 counts durations under a microsecond, and bucket n counts
+    durations of at least 2 ** (n - 1) microseconds, and under 2 ** n
+    microseconds. Adding a duration is cheap, and the memory used never
+    grows, at the cost of percentiles only being accurate to within a factor
+    of 2.
+    """
+
+    buckets = attrib(default=Factory(lambda: [0] * bucket_count))
+    count = attrib(default=Factory(int))
+    total = attrib(default=Factory(float))
+    maximum = attrib(default=Factory(float))
+
+    def add(self, seconds):
+        """Add a duration."""
+        self.buckets[
+            min(int(seconds * 1000000).bit_length(), bucket_count - 1)
+        ] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    @property
+    def mean(self):
+        """The mean duration."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Return the upper bound of the bucket containing the p (0-100)
+        percentile, or the maximum if that is smaller."""
+        wanted = self.count * p / 100
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return min(2 ** bucket / 1000000, self.maximum)
+        return self.maximum
+
+    def reset(self):
+        """Forget every duration."""
+        self.buckets = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def dump(self):
+        """Return self as a dictionary, including percentiles."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'max': self.maximum,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': list(self.buckets)
+        }
@@ -1,22 +1,72 @@
 """A line class."""
 
-from attr import attrs, attrib, Factory
+from .ansi import parse
 
 
-@attrs
 class Line:
-    """A generic line."""
-    text = attrib()
-    _gag = attrib(default=Factory(lambda: False), init=False)
-    _sub = attrib(default=Factory(lambda: False), init=False)
-
-    def __attrs_post_init__(self):
-        try:
-            self.text = str(self.text.decode(errors='ignore'))
-        except AttributeError:
-            pass  # Not needed.
+    """
+    A generic line.
+
+    Lines received from the server keep their raw bytes, and are only decoded
+    the first time their text is needed, so lines which are gagged without
+    being looked at are never decoded. Escape sequences are removed from the
+    text as it is decoded. Colours and other styles are kept in the styles
+    attribute, as returned by ansi.parse.
+
+    Lines made from strings (such as commands) are used as they are.
+    """
+
+    __slots__ = (
+        'raw', 'encoding', '_text', '_styles', '_gag', '_sub', 'dont_speak'
+    )
+
+    def __init__(self, text, encoding='utf-8'):
+        if isinstance(text, bytes):
+            self.raw = text
+            self._text = None
+        else:
+            self.raw = None
+            self._text = text
+        self.encoding = encoding
+        self._styles = ()
         self._gag = False
         self._sub = None
+        self.dont_speak = False
+
+    def __repr__(self):
+        return '{}({!r})'.format(
+            type(self).__name__,
+            self.raw if self._text is None else self._text
+        )
+
+    @property
+    def text(self):
+        """The text of the line, ignoring any gag or substitution."""
+        if self._text is None:
+            self._text, self._styles = parse(
+                self.raw.decode(self.encoding, errors='ignore')
+            )
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        """Replace the text of the line. The raw bytes are replaced too."""
+        self._text = value
+        self.raw = None
+
+    @property
+    def styles(self):
+        """The styles removed from the text."""
+        if self._text is None:
+            self.text  # Decode.
+        return self._styles
+
+    def copy(self):
+        """Return a copy of this line."""
+        line = type(self).__new__(type(self))
+        for name in Line.__slots__:
+            setattr(line, name, getattr(self, name))
+        return line
 
     def gag(self):
         """Gag the received text."""
@@ -49,3 +99,15 @@ class Line:
                 return self._sub
             else:
                 return self.text
+
+    def get_raw(self):
+        """Get the bytes of the line, as received from the server. Lines which
+        were not received from the server, or which have been substituted, are
+        encoded."""
+        if not self.gagged():
+            if self.substituted():
+                return self._sub.encode(self.encoding, errors='replace')
+            elif self.raw is None:
+                return self.text.encode(self.encoding, errors='replace')
+            else:
+                return self.raw
@@ -0,0 +1,98 @@
+"""Measure latency and throughput with many worlds connected at once."""
+
+import logging
+from time import perf_counter
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from plugins.base import Plugin
+from .fake_server import FakeMudFactory
+from .headless import NullOutput, create_world
+from .recording import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class ProbePlugin(Plugin):
+    name = 'Load Test Probe'
+    description = 'Time round trips using the echo command.'
+
+    def __init__(self, world):
+        super(ProbePlugin, self).__init__(world)
+        self.sent = {}
+        self.latencies = []
+        self.count = 0
+
+    def probe(self):
+        """Send an echo command, remembering when it was sent."""
+        self.count += 1
+        token = 'probe-{}-{}'.format(id(self.world), self.count)
+        self.sent[token] = perf_counter()
+        self.world.send_queue.put('echo {}'.format(token).encode())
+
+    def line_received(self, line):
+        started = self.sent.pop(line.get_text(), None)
+        if started is not None:
+            self.latencies.append(perf_counter() - started)
+            line.gag()
+            self.stop()
+
+
+def run(
+    worlds=10, duration=30.0, probe_interval=1.0, hostname='localhost',
+    port=None, **server_options
+):
+    """
+    Connect worlds headless worlds to a MUD, probe their round trip times
+    every probe_interval seconds for duration seconds, and return a
+    dictionary of results.
+
+    If port is None, a FakeMudFactory is started on a free port, with
+    server_options passed to it.
+    """
+    if port is None:
+        listener = reactor.listenTCP(
+            0, FakeMudFactory(**server_options), interface='127.0.0.1'
+        )
+        hostname = '127.0.0.1'
+        port = listener.getHost().port
+        logger.info('Started the fake MUD on port %d.', port)
+    probes = []
+    for number in range(worlds):
+        world = create_world(output=NullOutput())
+        world.config.world['name'] = 'Load Test {}'.format(number + 1)
+        world.config.connection['hostname'] = hostname
+        world.config.connection['port'] = port
+        probes.append(world.load_plugin(ProbePlugin))
+        world.connect()
+
+    def probe():
+        for plugin in probes:
+            if plugin.world.connected:
+                plugin.probe()
+
+    LoopingCall(probe).start(probe_interval, now=False)
+    started = perf_counter()
+    reactor.callLater(duration, reactor.stop)
+    reactor.run()
+    elapsed = perf_counter() - started
+    latencies = sorted(
+        latency for plugin in probes for latency in plugin.latencies
+    )
+    lines = sum(
+        plugin.world.protocol.lines_received for plugin in probes
+        if plugin.world.protocol is not None
+    )
+    return {
+        'worlds': worlds,
+        'connected': len(
+            [plugin for plugin in probes if plugin.world.connected]
+        ),
+        'seconds': elapsed,
+        'lines': lines,
+        'lines_per_second': lines / elapsed,
+        'probes': sum(plugin.count for plugin in probes),
+        'lost': sum(len(plugin.sent) for plugin in probes),
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1] if latencies else 0.0
+    }
@@ -1,8 +1,11 @@
 """MUDdle client protocol."""
 
+from time import thread_time
+from attr import attrs, attrib, Factory as AttrsFactory
 from twisted.protocols.basic import LineReceiver
 from twisted.internet.protocol import ClientFactory
 from .line import Line
+from .telnet import Telnet
 
 
 class Protocol(LineReceiver):
@@ -12,6 +15,8 @@ class Protocol(LineReceiver):
         """Initialise with a frame."""
         self.world = world
         world.protocol = self
+        self.telnet = None
+        self.lines_received = 0
 
     def log(self, message, level='info', *args, **kwargs):
         """Log a message."""
@@ -30,29 +35,105 @@ class Protocol(LineReceiver):
 
     def connectionMade(self):
         """Connected."""
+        self.telnet = Telnet(
+            self.transport.write,
+            compression=self.world.config.connection['compression']
+        )
         self.log('Connected.')
 
+    def sendLine(self, line):
+        """Send a line to the server."""
+        self.telnet.send(line + self.delimiter)
+
+    def sendLines(self, lines):
+        """Send several lines to the server in a single write."""
+        delimiter = self.delimiter
+        self.telnet.send(b''.join(line + delimiter for line in lines))
+
+    def dataReceived(self, data):
+        """Process data, recording the CPU time used against the world."""
+        started = thread_time()
+        try:
+            self._dataReceived(data)
+        finally:
+            self.world.cpu_time += thread_time() - started
+
+    def _dataReceived(self, data):
+        """Split data into lines, and process them as a single batch."""
+        if self.world.recorder is not None:
+            self.world.recorder.record(data)
+        data = self.telnet.receive(data)
+        lines = (self._buffer + data).split(self.delimiter)
+        self._buffer = lines.pop()
+        for line in lines:
+            if len(line) > self.MAX_LENGTH:
+                self._buffer = b''
+                return self.lineLengthExceeded(line)
+        if len(self._buffer) > self.MAX_LENGTH:
+            line = self._buffer
+            self._buffer = b''
+            return self.lineLengthExceeded(line)
+        if lines:
+            self.linesReceived(lines)
+
     def lineReceived(self, line):
         """A line was received from the server."""
-        line = Line(line)
-        self.world.handle_plugins('line_received', line)
-        for trigger in self.world.triggers:
-            m = trigger.match(line)
-            if m:
-                if m is True:
-                    args = []
-                    kwargs = []
-                else:
-                    args = m.groups()
-                    kwargs = m.groupdict()
+        self.linesReceived([line])
+
+    def linesReceived(self, lines):
+        """Several lines were received from the server. Plugins see the whole
+        batch, and the lines which survive are written to the frame all at
+        once."""
+        world = self.world
+        self.lines_received += len(lines)
+        encoding = world.config.connection['encoding']
+        lines = [Line(line, encoding) for line in lines]
+        trigger_set = world.trigger_set
+        for line in lines:
+            # Raw triggers run before anything decodes the line.
+            for trigger, args, kwargs in trigger_set.raw_matches(line):
+                trigger.run(line, *args, **kwargs)
+        world.handle_plugins_batch('line_received', lines)
+        for line in lines:
+            for trigger, args, kwargs in trigger_set.text_matches(line):
                 trigger.run(line, *args, **kwargs)
-        self.world.handle_plugins('pre_write', line)
-        if not line.gagged():
-            self.world.frame.write(line.get_text())
+        world.handle_plugins_batch('pre_write', lines)
+        texts = [line.get_text() for line in lines if not line.gagged()]
+        if texts:
+            world.scrollback.extend(texts)
+            world.frame.write('\n'.join(texts))
 
     def connectionLost(self, reason):
         """The connection was lost."""
         self.log(reason.getErrorMessage())
+        if self.telnet is not None and self.telnet.decompressed:
+            self.log(
+                'Received %d bytes, which decompressed to %d bytes.',
+                'info',
+                self.telnet.received,
+                self.telnet.decompressed
+            )
+
+
+@attrs
+class NullTransport:
+    """Used in place of a connection when replaying recordings or timing
+    commands. Counts the bytes written to it, then throws them away."""
+
+    written = attrib(default=AttrsFactory(int), init=False)
+
+    def write(self, data):
+        """Count data."""
+        self.written += len(data)
+
+    def writeSequence(self, data):
+        """Count every item in data."""
+        for item in data:
+            self.write(item)
+
+    def loseConnection(self):
+        """There is no connection to lose."""
+        pass
 
 
 class Factory(ClientFactory):
@@ -0,0 +1,118 @@
+"""Record and replay the data received by a world."""
+
+import struct
+import tracemalloc
+from time import perf_counter, sleep, time
+from attr import attrs, attrib, Factory
+from .protocol import NullTransport, Protocol
+
+magic = b'MUDdle recording 1\n'
+# Each chunk is preceded by its offset from the start of the recording in
+# seconds, and its length.
+header = struct.Struct('<dI')
+
+
+@attrs
+class Recorder:
+    """Write every chunk of data received by a world to a file."""
+
+    filename = attrib()
+    started = attrib(default=Factory(time), init=False)
+    chunks = attrib(default=Factory(int), init=False)
+
+    def __attrs_post_init__(self):
+        self.file = open(self.filename, 'wb')
+        self.file.write(magic)
+
+    def record(self, data):
+        """Record a chunk of data."""
+        self.file.write(header.pack(time() - self.started, len(data)))
+        self.file.write(data)
+        self.chunks += 1
+
+    def close(self):
+        """Stop recording."""
+        self.file.close()
+
+
+def read_recording(filename):
+    """Yield (offset, data) for every chunk in the recording filename."""
+    with open(filename, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError('%s is not a MUDdle recording.' % filename)
+        while True:
+            data = f.read(header.size)
+            if len(data) < header.size:
+                break
+            offset, length = header.unpack(data)
+            yield offset, f.read(length)
+
+
+def percentile(values, p):
+    """Return the p (0-100) percentile of the sorted list values."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def replay(filename, world, real_time=False):
+    """
+    Feed the recording filename through a new Protocol attached to world,
+    and return a dictionary of statistics.
+
+    If real_time is True, chunks are fed at the speed they were recorded.
+    Otherwise they are fed as fast as possible. Lines are processed a chunk
+    at a time, and none of the lines in a chunk are written until the whole
+    chunk has been processed, so the latency of every line is the time taken
+    by its chunk. Latency percentiles are therefore taken over chunks,
+    weighted by the number of lines in each. The mean time spent on each line
+    is reported separately.
+    """
+    chunks = list(read_recording(filename))
+    protocol = Protocol(world)
+    protocol.makeConnection(NullTransport())
+    latencies = []
+    busy = 0.0  # Time spent processing, excluding any sleeps.
+    started = perf_counter()
+    for offset, data in chunks:
+        if real_time:
+            sleep(max(0, offset - (perf_counter() - started)))
+        lines = protocol.lines_received
+        chunk_started = perf_counter()
+        protocol.dataReceived(data)
+        taken = perf_counter() - chunk_started
+        busy += taken
+        latencies.extend([taken] * (protocol.lines_received - lines))
+    elapsed = perf_counter() - started
+    latencies.sort()
+    lines = protocol.lines_received
+    return {
+        'chunks': len(chunks),
+        'lines': lines,
+        'seconds': elapsed,
+        'lines_per_second': lines / elapsed if elapsed else 0.0,
+        'line_mean': busy / lines if lines else 0.0,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99)
+    }
+
+
+def measure_memory(filename, world):
+    """
+    Feed the recording filename through a new Protocol attached to world,
+    and return (allocated, peak), the bytes still allocated afterwards and
+    the most allocated at once.
+
+    Tracing allocations slows everything down, so this is kept apart from
+    replay, and should be given a world of its own.
+    """
+    chunks = list(read_recording(filename))
+    protocol = Protocol(world)
+    protocol.makeConnection(NullTransport())
+    tracemalloc.start()
+    try:
+        for offset, data in chunks:
+            protocol.dataReceived(data)
+        return tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
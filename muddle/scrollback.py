@@ -0,0 +1,236 @@
+"""Scrollback storage."""
+
+import re
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from time import time
+from attr import attrs, attrib, Factory
+
+word_re = re.compile(r'\w+')
+
+
+def words(text):
+    """Return the set of lower case words in text."""
+    return set(word_re.findall(text.lower()))
+
+
+def grams(word):
+    """Return the set of three character substrings of word."""
+    return {word[index:index + 3] for index in range(len(word) - 2)}
+
+
+@attrs
+class Postings:
+    """The numbers of the lines a word appears in, oldest first."""
+
+    numbers = attrib(default=Factory(list))
+    start = attrib(default=Factory(int))
+
+    def __len__(self):
+        return len(self.numbers) - self.start
+
+    def drop_first(self):
+        """Forget the oldest number."""
+        self.start += 1
+        if self.start > 64 and self.start * 2 > len(self.numbers):
+            del self.numbers[:self.start]
+            self.start = 0
+
+    def after(self, number):
+        """Yield the numbers greater than number, in order."""
+        numbers = self.numbers
+        for index in range(
+            max(self.start, bisect_right(numbers, number)), len(numbers)
+        ):
+            yield numbers[index]
+
+    def before(self, number):
+        """Yield the numbers less than number, in reverse order."""
+        numbers = self.numbers
+        for index in range(
+            bisect_left(numbers, number) - 1, self.start - 1, -1
+        ):
+            yield numbers[index]
+
+
+@attrs
+class Scrollback:
+    """
+    A ring buffer of received lines, with an index of the words they contain
+    so they can be searched quickly.
+
+    Lines are numbered from 0 as they are added. Numbers are never reused,
+    so they remain valid after older lines have been dropped.
+    """
+
+    max_lines = attrib(default=Factory(lambda: 100000))
+    first = attrib(default=Factory(int), init=False)
+    _origin = attrib(default=Factory(int), init=False, repr=False)
+    _lines = attrib(default=Factory(list), init=False, repr=False)
+    _index = attrib(default=Factory(dict), init=False, repr=False)
+    _grams = attrib(default=Factory(dict), init=False, repr=False)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        """Yield (timestamp, text) for every line, oldest first."""
+        for number in range(self.first, self.end):
+            yield self.get(number)
+
+    @property
+    def end(self):
+        """The number the next line will be given."""
+        return self.first + len(self._lines)
+
+    def get(self, number):
+        """Return (timestamp, text) for the line with the given number."""
+        if not self.first <= number < self.end:
+            raise IndexError(number)
+        return self._lines[(number - self._origin) % self.max_lines]
+
+    def append(self, text, timestamp=None):
+        """Add a line of text, dropping the oldest line if the buffer is
+        full."""
+        if timestamp is None:
+            timestamp = time()
+        number = self.end
+        if len(self._lines) < self.max_lines:
+            self._lines.append((timestamp, text))
+        else:
+            self._drop()
+            self._lines[(number - self._origin) % self.max_lines] = (
+                timestamp, text
+            )
+        index = self._index
+        for word in words(text):
+            postings = index.get(word)
+            if postings is None:
+                postings = index[word] = Postings()
+                for gram in grams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+            postings.numbers.append(number)
+
+    def extend(self, texts, timestamp=None):
+        """Add several lines of text at once."""
+        if timestamp is None:
+            timestamp = time()
+        for text in texts:
+            self.append(text, timestamp=timestamp)
+
+    def _drop(self):
+        """Forget the oldest line."""
+        timestamp, text = self.get(self.first)
+        index = self._index
+        for word in words(text):
+            postings = index[word]
+            postings.drop_first()
+            if not postings:
+                del index[word]
+                for gram in grams(word):
+                    words_with_gram = self._grams[gram]
+                    words_with_gram.discard(word)
+                    if not words_with_gram:
+                        del self._grams[gram]
+        self.first += 1
+
+    def resize(self, max_lines):
+        """Change the number of lines kept, keeping the newest ones."""
+        if max_lines == self.max_lines:
+            return
+        end = self.end
+        lines = [
+            self.get(number)
+            for number in range(max(self.first, end - max_lines), end)
+        ]
+        self.max_lines = max_lines
+        self._lines = []
+        self._index.clear()
+        self._grams.clear()
+        self.first = self._origin = end - len(lines)
+        for timestamp, text in lines:
+            self.append(text, timestamp=timestamp)
+
+    def clear(self):
+        """Forget every line."""
+        self.first = self._origin = self.end
+        self._lines = []
+        self._index.clear()
+        self._grams.clear()
+
+    def postings(self, fragment, prefix=False, suffix=False):
+        """
+        Return a list of the postings of the indexed words which contain
+        fragment, or None if fragment is too short to look up.
+
+        If prefix is True, only words which start with fragment are included.
+        If suffix is True, only words which end with it are included. Words
+        are found through an index of their three character substrings.
+        """
+        if len(fragment) < 3:
+            return None
+        candidates = None
+        for gram in grams(fragment):
+            words_with_gram = self._grams.get(gram, ())
+            if candidates is None or len(words_with_gram) < len(candidates):
+                candidates = words_with_gram
+        return [
+            self._index[word] for word in candidates
+            if fragment in word and
+            (not prefix or word.startswith(fragment)) and
+            (not suffix or word.endswith(fragment))
+        ]
+
+    def find(self, text, start=None, backwards=False):
+        """
+        Return the number of the first line containing text (ignoring case),
+        or None.
+
+        The search starts after the line numbered start, or before it if
+        backwards is True. If start is None, the search starts at the oldest
+        line, or the newest if backwards is True.
+        """
+        text = text.lower()
+        if not text:
+            return None
+        if start is None:
+            start = self.end if backwards else self.first - 1
+        # Every word in text narrows down the lines which could match it.
+        # Words which are not at the edges of text must appear whole in a
+        # matching line. The word at the start of text must end a word in the
+        # line, the word at the end must start one, and a word which is all
+        # of text can be anywhere in a word. The word with the fewest
+        # postings gives the fewest candidates.
+        best = None
+        for m in word_re.finditer(text):
+            start_edge = m.start() == 0
+            end_edge = m.end() == len(text)
+            if not start_edge and not end_edge:
+                postings = self._index.get(m.group())
+                postings = [] if postings is None else [postings]
+            else:
+                postings = self.postings(
+                    m.group(), prefix=not start_edge, suffix=not end_edge
+                )
+                if postings is None:
+                    continue  # Too short.
+            if best is None or sum(map(len, postings)) < sum(map(len, best)):
+                best = postings
+        if best is not None:
+            if backwards:
+                candidates = merge(
+                    *[postings.before(start) for postings in best],
+                    reverse=True
+                )
+            else:
+                candidates = merge(
+                    *[postings.after(start) for postings in best]
+                )
+        elif backwards:
+            candidates = range(min(start, self.end) - 1, self.first - 1, -1)
+        else:
+            candidates = range(max(start + 1, self.first), self.end)
+        for number in candidates:
+            if text in self.get(number)[1].lower():
+                return number
+        return None
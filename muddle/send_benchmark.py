@@ -0,0 +1,70 @@
+"""Measure how many commands a world can send each second."""
+
+from time import perf_counter
+from .headless import NullOutput
+from .line import Line
+from .protocol import NullTransport, Protocol
+from .world import World
+
+# Plain commands, mixed with a few which are Jinja2 templates.
+commands = (
+    'north',
+    'look',
+    'say Hello there.',
+    'kill goblin',
+    'say I am playing {{ world.name }}.',
+    'get coins',
+    '{% for number in range(3) %}smile {% endfor %}',
+    'inventory'
+)
+
+
+def send_command(world, text):
+    """Process text the way MainFrame.do_send does, and queue it to be
+    sent. Return whether it was queued."""
+    line = Line(text)
+    world.handle_plugins('command_entered', line)
+    if line.gagged():
+        return False
+    for alias, args, kwargs in world.alias_set.matches(line):
+        alias.run(line, *args, **kwargs)
+    world.handle_plugins('pre_send', line)
+    if line.gagged():
+        return False
+    world.send_queue.put(
+        line.get_text().encode(
+            world.config.connection['encoding'], errors='replace'
+        )
+    )
+    return True
+
+
+def run(count=100000, plugins=()):
+    """
+    Send count commands (taken in turn from commands) through a new world
+    with the plugin classes in plugins loaded, and return a dictionary of
+    results.
+
+    Each command is written as soon as it is queued, as it would be if the
+    user typed it, and the bytes written are thrown away.
+    """
+    world = World(NullOutput())
+    world.config.world['name'] = 'Benchmark'
+    protocol = Protocol(world)
+    protocol.makeConnection(NullTransport())
+    for cls in plugins:
+        world.load_plugin(cls)
+    sent = 0
+    started = perf_counter()
+    for number in range(count):
+        if send_command(world, commands[number % len(commands)]):
+            sent += 1
+        world.send_queue.flush()
+    elapsed = perf_counter() - started
+    return {
+        'commands': count,
+        'sent': sent,
+        'bytes': protocol.transport.written,
+        'seconds': elapsed,
+        'sends_per_second': count / elapsed if elapsed else 0.0
+    }
@@ -0,0 +1,89 @@
+"""Outgoing command queue."""
+
+from collections import deque
+from time import time
+from attr import attrs, attrib, Factory
+from twisted.internet import reactor
+
+
+@attrs
+class SendQueue:
+    """
+    Commands waiting to be sent to a world.
+
+    With a command interval of 0, every command which is ready is sent in a
+    single write. Otherwise commands are sent one at a time, at most once
+    per interval.
+
+    Only use this from the reactor thread.
+    """
+
+    world = attrib()
+    commands = attrib(default=Factory(deque), init=False)
+    last_sent = attrib(default=Factory(float), init=False)
+    _call = attrib(default=Factory(lambda: None), init=False)
+
+    def __len__(self):
+        return len(self.commands)
+
+    @property
+    def interval(self):
+        """The minimum time between commands."""
+        return self.world.config.entry['command_interval']
+
+    def put(self, command):
+        """Queue a command (as bytes) to be sent."""
+        self.commands.append(command)
+        if self._call is None:
+            if self.interval:
+                delay = max(0, self.last_sent + self.interval - time())
+            else:
+                delay = 0  # Wait for any more commands sent this turn.
+            self._call = reactor.callLater(delay, self.send)
+
+    def send(self):
+        """Send the next command, or every command if there is no interval,
+        scheduling another call if there are more to come."""
+        self._call = None
+        if not self.commands:
+            return
+        elif self.interval:
+            self.write([self.commands.popleft()])
+            if self.commands:
+                self._call = reactor.callLater(self.interval, self.send)
+        else:
+            self.flush()
+
+    def flush(self):
+        """Send every queued command now."""
+        self.cancel_call()
+        commands = list(self.commands)
+        self.commands.clear()
+        if commands:
+            self.write(commands)
+
+    def cancel(self):
+        """Forget every queued command, returning how many there were."""
+        self.cancel_call()
+        count = len(self.commands)
+        self.commands.clear()
+        return count
+
+    def cancel_call(self):
+        """Cancel any scheduled send."""
+        if self._call is not None:
+            if self._call.active():
+                self._call.cancel()
+            self._call = None
+
+    def write(self, commands):
+        """Write commands to the world's connection."""
+        protocol = self.world.protocol
+        if protocol is None or not protocol.connected:
+            self.world.logger.warning(
+                'Dropping %d command(s) because the world is not connected.',
+                len(commands)
+            )
+        else:
+            protocol.sendLines(commands)
+            self.last_sent = time()
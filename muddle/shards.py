@@ -0,0 +1,245 @@
+"""
+Run groups of worlds in separate worker processes.
+
+Each shard is a process running its own reactor and Lua runtime, so a world
+with heavy triggers only slows down the worlds in its own shard. Shards talk
+to the parent process over a pipe:
+
+Parent to shard:
+('send', world_name, command) - Send a command to a world.
+('stats',) - Ask for a ('stats', data) reply.
+('stop',) - Save every world and exit.
+
+Shard to parent:
+('loaded', world_names) - The shard has loaded its worlds.
+('output', world_name, text) - A world wrote some text.
+('stats', data) - The CPU time used by the shard and each of its worlds.
+"""
+
+import logging
+import os
+import sys
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from threading import Thread
+from time import time
+from attr import attrs, attrib, Factory
+
+logger = logging.getLogger(__name__)
+
+context = get_context('spawn')  # Never fork a running reactor.
+
+
+def shard_main(connection, filenames, log_level):
+    """The entry point for shard processes."""
+    logging.basicConfig(level=log_level)
+    import application
+    from twisted.internet import reactor
+    from .headless import PipeOutput, load_worlds, save_worlds
+    application.reload_plugins()
+    worlds = load_worlds(
+        filenames, output_factory=lambda: PipeOutput(connection=connection)
+    )
+    worlds_by_name = {world.name: world for world in worlds}
+    connection.send(('loaded', list(worlds_by_name)))
+
+    def handle(message):
+        """Handle a message from the parent."""
+        if message[0] == 'send':
+            name, command = message[1:]
+            world = worlds_by_name.get(name)
+            if world is None:
+                logger.warning('No world named %r.', name)
+            else:
+                world.send(command)
+        elif message[0] == 'stats':
+            times = os.times()
+            connection.send(
+                (
+                    'stats',
+                    {
+                        'cpu_time': times.user + times.system,
+                        'worlds': {
+                            world.name: world.cpu_time for world in worlds
+                        }
+                    }
+                )
+            )
+        elif message[0] == 'stop':
+            reactor.stop()
+        else:
+            logger.warning('Unknown message %r.', message)
+
+    def read():
+        """Read messages from the parent until the pipe closes."""
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                break
+            reactor.callFromThread(handle, message)
+        if reactor.running:
+            reactor.callFromThread(reactor.stop)
+
+    Thread(target=read, daemon=True).start()
+    reactor.run()
+    save_worlds(worlds)
+
+
+@attrs
+class Shard:
+    """A worker process running a group of worlds."""
+
+    number = attrib()
+    filenames = attrib()
+    process = attrib(default=Factory(lambda: None), init=False)
+    connection = attrib(default=Factory(lambda: None), init=False)
+    world_names = attrib(default=Factory(list), init=False)
+    stats = attrib(default=Factory(dict), init=False)
+    restarts = attrib(default=Factory(int), init=False)
+
+    def start(self):
+        """Start the worker process."""
+        if self.connection is not None:
+            self.connection.close()
+        parent_connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=shard_main,
+            args=(
+                child_connection,
+                self.filenames,
+                logging.getLogger().getEffectiveLevel()
+            ),
+            name='Shard {}'.format(self.number),
+            daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.connection = parent_connection
+        logger.info(
+            'Started shard %d (process %d) with %d world(s).',
+            self.number,
+            self.process.pid,
+            len(self.filenames)
+        )
+
+    def send(self, *message):
+        """Send a message to the worker, ignoring a closed pipe."""
+        try:
+            self.connection.send(message)
+        except (OSError, ValueError):
+            pass
+
+
+def report(shards):
+    """Log the CPU time used by each shard and world."""
+    for shard in shards:
+        stats = shard.stats
+        if not stats:
+            continue
+        logger.info(
+            'Shard %d: %.3f seconds of CPU time, %d restart(s).',
+            shard.number,
+            stats['cpu_time'],
+            shard.restarts
+        )
+        for name, cpu_time in stats['worlds'].items():
+            logger.info(
+                'Shard %d, world %s: %.3f seconds of CPU time.',
+                shard.number,
+                name,
+                cpu_time
+            )
+
+
+def read_commands(shards):
+    """Read lines of the form "world: command" from stdin, and send each
+    command to the shard running the named world."""
+    for line in sys.stdin:
+        name, sep, command = line.rstrip('\n').partition(': ')
+        if not sep:
+            logger.warning('Commands must look like "world: command".')
+            continue
+        for shard in shards:
+            if name in shard.world_names:
+                shard.send('send', name, command)
+                break
+        else:
+            logger.warning('No world named %r.', name)
+
+
+def handle(shard, message):
+    """Handle a message from a shard."""
+    if message[0] == 'output':
+        name, text = message[1:]
+        logger.info('%s: %s', name or 'Untitled World', text)
+    elif message[0] == 'loaded':
+        shard.world_names = message[1]
+    elif message[0] == 'stats':
+        shard.stats = message[1]
+    else:
+        logger.warning(
+            'Unknown message from shard %d: %r.', shard.number, message
+        )
+
+
+def run(filenames, shards=2, report_interval=60.0, max_restarts=5):
+    """Split the worlds in filenames between shards worker processes, and
+    log their output until every worker has exited. A worker which crashes
+    is restarted, up to max_restarts times."""
+    shards = [
+        Shard(number, filenames[number::shards])
+        for number in range(shards)
+        if filenames[number::shards]
+    ]
+    for shard in shards:
+        shard.start()
+    Thread(target=read_commands, args=[shards], daemon=True).start()
+    next_report = time() + report_interval if report_interval else None
+    running = list(shards)
+    try:
+        while running:
+            timeout = None
+            if next_report is not None:
+                timeout = max(0, next_report - time())
+            ready = wait(
+                [shard.connection for shard in running] +
+                [shard.process.sentinel for shard in running],
+                timeout
+            )
+            for shard in list(running):
+                if shard.connection in ready:
+                    try:
+                        handle(shard, shard.connection.recv())
+                        continue
+                    except (EOFError, OSError):
+                        pass  # Check the process below.
+                if shard.process.sentinel in ready or \
+                        not shard.process.is_alive():
+                    shard.process.join()
+                    code = shard.process.exitcode
+                    if code and shard.restarts < max_restarts:
+                        shard.restarts += 1
+                        logger.warning(
+                            'Shard %d exited with code %d, restarting it.',
+                            shard.number,
+                            code
+                        )
+                        shard.start()
+                    else:
+                        logger.info(
+                            'Shard %d exited with code %d.', shard.number, code
+                        )
+                        running.remove(shard)
+            if next_report is not None and time() >= next_report:
+                report(shards)
+                for shard in running:
+                    shard.send('stats')
+                next_report = time() + report_interval
+    except KeyboardInterrupt:
+        logger.info('Stopping %d shard(s).', len(running))
+        for shard in running:
+            shard.send('stop')
+        for shard in running:
+            shard.process.join()
+    return shards
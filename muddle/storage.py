@@ -0,0 +1,115 @@
+"""Saving worlds safely."""
+
+import os
+import os.path
+import sqlite3
+import stat
+from hashlib import sha1
+from json import dumps, loads
+from tempfile import mkstemp
+from attr import attrs, attrib, Factory
+
+
+def atomic_write(filename, data):
+    """Write the bytes data to filename. The data is written to a temporary
+    file which is then renamed, so if writing is interrupted, filename keeps
+    its old contents. The permissions of filename are kept, or set as for
+    any new file if it does not exist yet."""
+    directory = os.path.dirname(os.path.abspath(filename))
+    try:
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, temp = mkstemp(
+        dir=directory, prefix='.' + os.path.basename(filename), suffix='.tmp'
+    )
+    try:
+        os.chmod(temp, mode)  # mkstemp only lets the owner read the file.
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, filename)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+def digest(data):
+    """Return a digest of the bytes data, used to tell whether a file needs
+    writing."""
+    return sha1(data).hexdigest()
+
+
+@attrs
+class ThingStore:
+    """
+    Stores triggers and aliases in an SQLite database.
+
+    Every thing is stored as a row of JSON, keyed by its kind and the key
+    its world orders it by, so adding, removing or disabling one thing leaves
+    the rows of every other thing alone. Only rows which have changed since
+    they were last loaded or saved are written, so saving a large world after
+    changing one trigger writes one row.
+    """
+
+    filename = attrib()
+    rows = attrib(default=Factory(dict), init=False)
+
+    def __attrs_post_init__(self):
+        self.connection = sqlite3.connect(
+            self.filename, check_same_thread=False
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS things ('
+            'kind TEXT NOT NULL, position INTEGER NOT NULL, data TEXT NOT '
+            'NULL, PRIMARY KEY (kind, position))'
+        )
+        self.rows = {
+            (kind, position): data for kind, position, data in
+            self.connection.execute('SELECT kind, position, data FROM things')
+        }
+
+    def load(self, kind):
+        """Return a list of (key, dictionary) pairs for the things stored
+        under kind, in order."""
+        return [
+            (key, loads(data)) for (row_kind, key), data in sorted(
+                self.rows.items()
+            ) if row_kind == kind
+        ]
+
+    def save(self, kind, things):
+        """Store things, a list of (key, dictionary) pairs, under kind, in
+        one transaction. Returns the number of rows written or deleted."""
+        rows = {
+            (kind, key): dumps(thing, sort_keys=True) for key, thing in things
+        }
+        changed = [
+            (row_kind, position, data)
+            for (row_kind, position), data in rows.items()
+            if self.rows.get((row_kind, position)) != data
+        ]
+        removed = [
+            key for key in self.rows if key[0] == kind and key not in rows
+        ]
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO things VALUES (?, ?, ?)', changed
+            )
+            self.connection.executemany(
+                'DELETE FROM things WHERE kind = ? AND position = ?', removed
+            )
+        for key in removed:
+            del self.rows[key]
+        self.rows.update(rows)
+        return len(changed) + len(removed)
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
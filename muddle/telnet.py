@@ -0,0 +1,151 @@
+"""Telnet option negotiation, including MCCP (compression)."""
+
+import zlib
+from attr import attrs, attrib, Factory
+
+SE = 240
+SB = 250
+WILL = 251
+WONT = 252
+DO = 253
+DONT = 254
+IAC = 255
+
+MCCP2 = 86  # Server to client compression.
+MCCP3 = 87  # Client to server compression.
+
+iac = bytes([IAC])
+iac_se = bytes([IAC, SE])
+
+
+@attrs
+class Telnet:
+    """
+    Strip telnet commands from incoming data, negotiating options as they
+    arrive.
+
+    The only options agreed to are MCCP2 and MCCP3, and only if compression
+    is True. Everything the server asks for is refused. Following RFC 1143,
+    only changes of state are answered, so a server which repeats itself
+    never gets a second reply.
+
+    write - A callable which sends bytes to the server.
+    """
+
+    write = attrib()
+    compression = attrib(default=Factory(lambda: True))
+    received = attrib(default=Factory(int), init=False)
+    decompressed = attrib(default=Factory(int), init=False)
+    _pending = attrib(default=Factory(bytes), init=False)
+    _decompressor = attrib(default=Factory(lambda: None), init=False)
+    _compressor = attrib(default=Factory(lambda: None), init=False)
+    _answered = attrib(default=Factory(set), init=False)
+    _enabled = attrib(default=Factory(set), init=False)
+
+    @property
+    def compressing(self):
+        """Return whether data from the server is currently compressed."""
+        return self._decompressor is not None
+
+    def receive(self, data):
+        """Return data with any compression removed, and with telnet commands
+        removed and acted upon."""
+        self.received += len(data)
+        output = bytearray()
+        while data:
+            decompressor = self._decompressor
+            if decompressor is None:
+                data = self._parse(data, output)
+            else:
+                plain = decompressor.decompress(data)
+                self.decompressed += len(plain)
+                if decompressor.eof:  # The server stopped compressing.
+                    data = decompressor.unused_data
+                    self._decompressor = None
+                else:
+                    data = b''
+                self._parse(plain, output)
+        return bytes(output)
+
+    def _parse(self, data, output):
+        """Append the text in data to output, acting on any telnet commands.
+        If compression starts part way through, the rest of the (compressed)
+        data is returned."""
+        if self._pending:
+            data = self._pending + data
+            self._pending = b''
+        start = 0
+        length = len(data)
+        while start < length:
+            index = data.find(iac, start)
+            if index == -1:
+                output += data[start:]
+                break
+            output += data[start:index]
+            if index + 1 == length:
+                self._pending = data[index:]
+                break
+            command = data[index + 1]
+            if command == IAC:
+                output.append(IAC)  # Escaped.
+                start = index + 2
+            elif command in (WILL, WONT, DO, DONT):
+                if index + 2 == length:
+                    self._pending = data[index:]
+                    break
+                self._negotiate(command, data[index + 2])
+                start = index + 3
+            elif command == SB:
+                end = data.find(iac_se, index + 2)
+                if end == -1:
+                    self._pending = data[index:]
+                    break
+                start = end + 2
+                if end > index + 2 and data[index + 2] == MCCP2:
+                    self._decompressor = zlib.decompressobj()
+                    return data[start:]
+            else:
+                start = index + 2  # Go ahead, no operation and friends.
+        return b''
+
+    def _negotiate(self, command, option):
+        """Respond to a WILL, WONT, DO or DONT."""
+        if command == WILL:
+            if option in self._enabled:
+                pass  # Already agreed to.
+            elif option in (MCCP2, MCCP3) and self.compression:
+                self._enabled.add(option)
+                self.command(DO, option)
+                if option == MCCP3:
+                    self.command(SB, option, IAC, SE)
+                    self._compressor = zlib.compressobj()
+            elif (command, option) not in self._answered:
+                self._answered.add((command, option))
+                self.command(DONT, option)
+        elif command == WONT:
+            if option in self._enabled:
+                self._enabled.remove(option)
+                if option == MCCP3:
+                    # End the compressed stream.
+                    self.write(self._compressor.flush())
+                    self._compressor = None
+                self.command(DONT, option)
+        elif command == DO and (command, option) not in self._answered:
+            self._answered.add((command, option))
+            self.command(WONT, option)
+
+    def command(self, *values):
+        """Send a telnet command to the server."""
+        self._write(bytes((IAC,) + values))
+
+    def send(self, data):
+        """Send data to the server, escaping any IAC bytes."""
+        self._write(data.replace(iac, iac + iac))
+
+    def _write(self, data):
+        """Write data to the server, compressing it if MCCP3 is active."""
+        if self._compressor is not None:
+            data = self._compressor.compress(data) + self._compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+        self.write(data)
@@ -0,0 +1,287 @@
+"""Compiled sets of triggers."""
+
+import re
+from bisect import bisect_left, bisect_right, insort
+from functools import lru_cache
+from attr import attrs, attrib, Factory
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11.
+    import sre_parse
+
+
+def _parse(pattern):
+    """Return pattern parsed, or None if it is invalid or ignores case."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    state = getattr(parsed, 'state', None) or parsed.pattern
+    if state.flags & re.IGNORECASE:
+        return None
+    return parsed
+
+
+def _to_literal(pattern, codes):
+    """Return the character codes codes as the same type as pattern."""
+    if isinstance(pattern, bytes):
+        return bytes(codes)
+    return ''.join(map(chr, codes))
+
+
+@lru_cache(maxsize=None)
+def literal_prefix(pattern):
+    """Return the literal text that any match of pattern must start with.
+    Works with both str and bytes patterns."""
+    parsed = _parse(pattern)
+    if parsed is None:
+        return pattern[:0]
+    return _to_literal(pattern, _literal_prefix(parsed)[0])
+
+
+@lru_cache(maxsize=None)
+def required_literal(pattern):
+    """Return the longest literal text that any match of pattern must
+    contain, wherever it is. Works with both str and bytes patterns."""
+    parsed = _parse(pattern)
+    if parsed is None:
+        return pattern[:0]
+    return _to_literal(pattern, max(_literal_runs(parsed), key=len))
+
+
+def _literal_prefix(items):
+    """Return (codes, complete) for a parsed sequence, where codes are the
+    character codes of the prefix, and complete is True if every item in the
+    sequence was a literal."""
+    codes = []
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            codes.append(av)
+        elif op == sre_parse.AT and av in (
+            sre_parse.AT_BEGINNING,
+            sre_parse.AT_BEGINNING_STRING
+        ):
+            continue  # Matches are always anchored anyway.
+        elif op == sre_parse.SUBPATTERN and not av[1] & re.IGNORECASE:
+            sub_codes, complete = _literal_prefix(av[-1])
+            codes.extend(sub_codes)
+            if not complete:
+                return codes, False
+        else:
+            return codes, False
+    return codes, True
+
+
+def _literal_runs(items):
+    """Return a list of the runs of character codes which a match of the
+    parsed sequence items must contain. Anything optional or repeated ends a
+    run, and is not looked inside."""
+    runs = [[]]
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            runs[-1].append(av)
+        elif op == sre_parse.SUBPATTERN and not av[1] & re.IGNORECASE:
+            sub_runs = _literal_runs(av[-1])
+            runs[-1].extend(sub_runs[0])
+            if len(sub_runs) > 1:
+                runs.extend(sub_runs[1:])
+        elif op == sre_parse.AT:
+            continue  # Anchors match no text.
+        else:
+            runs.append([])
+    return runs
+
+
+@attrs
+class Index:
+    """
+    An index of the patterns in a trigger set which are matched against the
+    same kind of data (either text or bytes).
+
+    Patterns which are not regular expressions are looked up by their exact
+    value. The rest are indexed by the literal prefix any match must start
+    with or, if they have none, by the longest literal text any match must
+    contain, such as " tells you '" in "(\\w+) tells you '(.*)'". Only
+    patterns with neither are tried against every line.
+    """
+
+    prefixes = attrib(default=Factory(dict), init=False)
+    locations = attrib(default=Factory(dict), init=False)
+    exact = attrib(default=Factory(dict), init=False)
+    buckets = attrib(default=Factory(dict), init=False)
+    substrings = attrib(default=Factory(dict), init=False)
+    required = attrib(default=Factory(dict), init=False)
+    always = attrib(default=Factory(list), init=False)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def add(self, key, source, regexp):
+        """Index the pattern source under key."""
+        if not regexp:
+            keys = self.exact.setdefault(source, [])
+        else:
+            prefix = literal_prefix(source)
+            self.prefixes[key] = prefix
+            if prefix:
+                keys = self.buckets.setdefault(prefix[:1], [])
+            else:
+                substring = required_literal(source)
+                if substring:
+                    self.required[key] = substring
+                    keys = self.substrings.setdefault(substring, [])
+                else:
+                    keys = self.always
+        insort(keys, key)
+        self.locations[key] = keys
+
+    def remove(self, key):
+        """Remove key from the index, if it is there."""
+        self.prefixes.pop(key, None)
+        keys = self.locations.pop(key, None)
+        if keys is not None:
+            del keys[bisect_left(keys, key)]
+        substring = self.required.pop(key, None)
+        if substring is not None and not self.substrings[substring]:
+            # Every substring is searched for, so forget unused ones.
+            del self.substrings[substring]
+
+    def candidates(self, data, after=None):
+        """Return the sorted keys of the patterns which might match data."""
+        prefixes = self.prefixes
+        keys = list(self.exact.get(data, ()))
+        keys += [
+            key for key in self.buckets.get(data[:1], ())
+            if data.startswith(prefixes[key])
+        ]
+        for substring, substring_keys in self.substrings.items():
+            if substring in data:
+                keys.extend(substring_keys)
+        keys.extend(self.always)
+        keys.sort()
+        if after is not None:
+            del keys[:bisect_right(keys, after)]
+        return keys
+
+
+@attrs
+class TriggerSet:
+    """
+    A set of triggers (or aliases).
+
+    Triggers are indexed so only the few which could possibly match a line
+    have their full regular expressions run against it. Triggers which match
+    raw bytes (see Trigger.raw) are kept in a separate index from those which
+    match text.
+    """
+
+    things = attrib(default=Factory(dict), init=False)
+    _next_key = attrib(default=Factory(int), init=False)
+    _built = attrib(default=Factory(bool), init=False)
+    _text_index = attrib(default=Factory(Index), init=False)
+    _raw_index = attrib(default=Factory(Index), init=False)
+
+    def add(self, thing, key=None):
+        """Add thing to this set, returning the key it was stored under.
+        Things are matched in the order of their keys."""
+        if key is None:
+            key = self._next_key
+        self._next_key = max(self._next_key, key + 1)
+        self.things[key] = thing
+        if self._built:
+            self._index(key, thing)
+        return key
+
+    def remove(self, key):
+        """Remove the thing stored under key."""
+        del self.things[key]
+        if self._built:
+            self._text_index.remove(key)
+            self._raw_index.remove(key)
+
+    def clear(self):
+        """Remove everything from this set."""
+        self.things.clear()
+        self._next_key = 0
+        self.refresh()
+
+    def refresh(self):
+        """Throw away the index so it is rebuilt the next time a line is
+        matched. Call this when a pattern changes."""
+        self._built = False
+        self._text_index = Index()
+        self._raw_index = Index()
+
+    def _build(self):
+        """Build the index."""
+        self.refresh()
+        self._built = True
+        for key, thing in self.things.items():
+            self._index(key, thing)
+
+    def _index(self, key, thing):
+        """Add thing to the index under key."""
+        if thing.pattern is None:
+            return  # Never matches.
+        index = self._raw_index if thing.raw else self._text_index
+        index.add(key, thing.source, thing.regexp)
+
+    def matches(self, line):
+        """Yield (thing, args, kwargs) for every thing which matches line.
+        Things which match raw bytes come first."""
+        yield from self.raw_matches(line)
+        yield from self.text_matches(line)
+
+    def raw_matches(self, line):
+        """Yield (thing, args, kwargs) for every thing which matches the raw
+        bytes of line, in order."""
+        if not self._built:
+            self._build()
+        return self._matches(line, self._raw_index, line.get_raw)
+
+    def text_matches(self, line):
+        """Yield (thing, args, kwargs) for every thing which matches the text
+        of line, in order."""
+        if not self._built:
+            self._build()
+        return self._matches(line, self._text_index, line.get_text)
+
+    def _matches(self, line, index, get_data):
+        """
+        Yield (thing, args, kwargs) for every thing in index which matches
+        the data returned by get_data.
+
+        Each thing is matched against the data as it stands when its turn
+        comes, so gags and substitutions made by running earlier matches are
+        honoured exactly as if every thing was tried in turn.
+        """
+        if not len(index):
+            return
+        data = get_data()
+        if data is None:
+            return
+        keys = index.candidates(data)
+        position = 0
+        while position < len(keys):
+            key = keys[position]
+            position += 1
+            thing = self.things.get(key)
+            if thing is None:
+                continue  # Removed while matching.
+            m = thing.match(line)
+            if not m:
+                continue
+            args, kwargs = thing.arguments(m)
+            yield thing, args, kwargs
+            new_data = get_data()
+            if new_data is None:
+                return  # Gagged.
+            elif new_data != data or not self._built:
+                if not self._built:
+                    self._build()
+                    index = self._raw_index if thing.raw else \
+                        self._text_index
+                data = new_data
+                keys = index.candidates(data, after=key)
+                position = 0
@@ -1,10 +1,59 @@
 """Triggers and aliases."""
 
 import re
-from attr import attrs, attrib, Factory
-from lupa import LuaRuntime
+from time import perf_counter
+from attr import attrs, attrib, Factory, asdict
+from lupa import LuaError, LuaRuntime
 
 lua = LuaRuntime()
+lua_functions = {}  # Compiled trigger bodies, keyed by their code.
+
+
+def compile_code(code):
+    """Return a lua function wrapping code. Functions are cached, so
+    identical bodies are only compiled once for every trigger in every
+    world."""
+    func = lua_functions.get(code)
+    if func is None:
+        func = lua.eval(
+            'function(trigger, line, args, kwargs)\n{}\nend'.format(code)
+        )
+        lua_functions[code] = func
+    return func
+
+
+@attrs
+class Statistics:
+    """Usage statistics for a trigger or alias."""
+
+    attempts = attrib(default=Factory(int))
+    hits = attrib(default=Factory(int))
+    match_time = attrib(default=Factory(float))
+    run_time = attrib(default=Factory(float))
+
+    @property
+    def total_time(self):
+        """The total time spent matching and running."""
+        return self.match_time + self.run_time
+
+    def reset(self):
+        """Reset all counters."""
+        self.attempts = 0
+        self.hits = 0
+        self.match_time = 0.0
+        self.run_time = 0.0
+
+    def dump(self):
+        """Return self as a dictionary."""
+        return asdict(self)
+
+
+def to_statistics(value):
+    """Convert a dictionary (as loaded from a world file) to a Statistics
+    instance."""
+    if isinstance(value, Statistics):
+        return value
+    return Statistics(**value)
 
 
 @attrs
@@ -17,7 +66,9 @@ class Trigger:
     regexp = attrib(default=Factory(lambda: True))
     code = attrib(default=Factory(str))
     literal = attrib(default=Factory(bool))
+    raw = attrib(default=Factory(bool))
     classes = attrib(default=Factory(list))
+    statistics = attrib(default=Factory(Statistics), converter=to_statistics)
 
     def __attrs_post_init__(self):
         """Finish initialising the trigger."""
@@ -25,45 +76,132 @@ class Trigger:
 
     def match(self, line):
         """"Match this trigger against the provided line."""
+        if not self.world.profiling:
+            return self._match(line)
+        started = perf_counter()
+        m = self._match(line)
+        self.statistics.match_time += perf_counter() - started
+        self.statistics.attempts += 1
+        if m:
+            self.statistics.hits += 1
+        return m
+
+    def _match(self, line):
+        """Actually match the line."""
         if not line.gagged():
             if self.pattern is None:
                 return False
-            elif not self.regexp:
-                return line.get_text() == self.pattern
-            else:
-                return self._pattern.match(line.get_text())
+            data = line.get_raw() if self.raw else line.get_text()
+            if not self.regexp:
+                return data == self.source
+            try:
+                pattern = self.get_pattern()
+            except re.error as e:
+                self.invalid('pattern', self.pattern, e)
+                return False
+            return pattern.match(data)
+
+    def invalid(self, what, value, error):
+        """Log error, caused by value (the pattern or code of this thing),
+        and disable this thing. Patterns and code are compiled lazily, so
+        their errors are only noticed when they are first needed."""
+        self.world.logger.warning(
+            'Disabling %s %s, which has invalid %s %r: %s.',
+            type(self).__name__.lower(),
+            self.name or '',
+            what,
+            value,
+            error
+        )
+        self.world.disable(self)
 
     def update(self):
-        """Update this trigger."""
-        if self.regexp:
-            self._pattern = re.compile(self.pattern)
-        else:
-            self._pattern = None
-        if self.literal:
-            self._func = None
-        else:
-            self._func = lua.eval(
-                'function(trigger, line, args, kwargs)\n{}\nend'.format(
-                    self.code
+        """Update this trigger. The pattern and code are compiled the next
+        time they are needed."""
+        self._pattern = None
+        self._func = None
+        self._source = None
+
+    @property
+    def source(self):
+        """The pattern as it is matched. Raw triggers match bytes, so their
+        patterns are encoded with the world's encoding."""
+        if self._source is None and self.pattern is not None:
+            if self.raw:
+                self._source = self.pattern.encode(
+                    self.world.config.connection['encoding']
                 )
+            else:
+                self._source = self.pattern
+        return self._source
+
+    def get_pattern(self):
+        """Get the compiled pattern for this trigger."""
+        if self._pattern is None:
+            self._pattern = re.compile(self.source)
+        return self._pattern
+
+    def arguments(self, m):
+        """Return (args, kwargs) for the match m, as returned by the match
+        method. The groups matched by raw triggers are decoded."""
+        if m is True:
+            return (), {}
+        args = m.groups()
+        kwargs = m.groupdict()
+        if self.raw:
+            encoding = self.world.config.connection['encoding']
+            args = tuple(
+                arg if arg is None else arg.decode(encoding, errors='ignore')
+                for arg in args
             )
+            kwargs = {
+                key: value if value is None else value.decode(
+                    encoding, errors='ignore'
+                ) for key, value in kwargs.items()
+            }
+        return args, kwargs
+
+    def get_func(self):
+        """Get the lua function for this trigger."""
+        if self._func is None:
+            self._func = compile_code(self.code)
+        return self._func
 
     def run(self, line, *args, **kwargs):
         """Run the code of this trigger with line, args and kwargs."""
+        if not self.world.profiling:
+            return self._run(line, args, kwargs)
+        started = perf_counter()
+        try:
+            self._run(line, args, kwargs)
+        finally:
+            self.statistics.run_time += perf_counter() - started
+
+    def _run(self, line, args, kwargs):
+        """Actually run the code."""
         if self.literal:
             self.world.send(self.code.format(*args, **kwargs))
         else:
-            self._func(self, line, args, kwargs)
+            try:
+                func = self.get_func()
+            except LuaError as e:
+                return self.invalid('code', self.code, e)
+            func(self, line, args, kwargs)
 
-    def dump(self):
-        """Return self as a dictionary."""
-        return {
+    def dump(self, statistics=False):
+        """Return self as a dictionary, including usage statistics if
+        statistics is True."""
+        d = {
             'name': self.name,
             'pattern': self.pattern,
             'regexp': self.regexp,
             'code': self.code,
             'literal': self.literal,
+            'raw': self.raw,
             'classes': self.classes}
+        if statistics:
+            d['statistics'] = self.statistics.dump()
+        return d
 
 
 class Alias(Trigger):
@@ -3,18 +3,72 @@
 import logging
 import os
 import os.path
-from json import dump, load
+from inspect import iscoroutine
+from threading import Lock
+from json import dumps, loads
+from time import perf_counter
 from attr import attrs, attrib, Factory as AttrsFactory
 from twisted.internet import reactor
+from twisted.internet.defer import CancelledError, Deferred, ensureDeferred
+from twisted.internet.threads import deferToThread
+from twisted.python.failure import Failure
+from twisted.python.threadable import isInIOThread
 import application
 from .config import Config
 from .triggers import Trigger, Alias
+from .trigger_set import TriggerSet
+from .histogram import Histogram
+from .line import Line
+from .scrollback import Scrollback
+from .send_queue import SendQueue
+from .recording import Recorder
+from .storage import ThingStore, atomic_write, digest
 from .protocol import Factory
-from plugins.base import StopPropagation
+from plugins.base import StopPropagation, batch_hooks, hooks
 
 world_dir = os.path.join(application.config_dir, 'worlds')
 
 
+class FrameHandler(logging.Handler):
+    """Writes the records logged by each world to that world's frame."""
+
+    def emit(self, record):
+        world = getattr(record, 'world', None)
+        if world is None:
+            return  # Not logged by a world.
+        try:
+            world.frame.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+# Every world logs through this logger, so worlds never leave loggers or
+# handlers behind.
+logger = logging.getLogger('[World]')
+logger.addHandler(FrameHandler())
+
+
+def call_hook(plugin, attr, *args, **kwargs):
+    """Call the hook named attr on plugin."""
+    return getattr(plugin, attr)(*args, **kwargs)
+
+
+def trap_stop(failure, stops):
+    """An errback which appends the StopPropagation that caused failure to
+    stops, or returns failure if it was not caused by one. Coroutines cannot
+    raise StopIteration, so Python turns StopPropagation into a RuntimeError
+    when a coroutine raises it (PEP 479)."""
+    e = failure.value
+    if isinstance(e, RuntimeError) and isinstance(
+        e.__cause__, StopPropagation
+    ):
+        e = e.__cause__
+    if isinstance(e, StopPropagation):
+        stops.append(e)
+    else:
+        return failure
+
+
 @attrs
 class World:
     """An instance of a world."""
@@ -24,97 +78,215 @@ class World:
     triggers = attrib(default=AttrsFactory(list))
     aliases = attrib(default=AttrsFactory(list))
     disabled = attrib(default=AttrsFactory(list))
-    classes = attrib(default=AttrsFactory(list))
+    classes = attrib(default=AttrsFactory(set))
     protocol = attrib(default=AttrsFactory(lambda: None))
+    profiling = attrib(default=AttrsFactory(bool))
+    plugin_profiling = attrib(default=AttrsFactory(bool))
+    plugin_statistics = attrib(default=AttrsFactory(dict), init=False)
+    trigger_set = attrib(default=AttrsFactory(TriggerSet), init=False)
+    alias_set = attrib(default=AttrsFactory(TriggerSet), init=False)
+    _order = attrib(default=AttrsFactory(dict), init=False)
+    _next_order = attrib(default=AttrsFactory(int), init=False)
+    _class_index = attrib(default=AttrsFactory(dict), init=False)
+    _outgoing = attrib(default=AttrsFactory(list), init=False)
+    _outgoing_lock = attrib(default=AttrsFactory(Lock), init=False)
 
     def __attrs_post_init__(self):
         self.factory = Factory(self)
-        self.logger = logging.getLogger('[World]')
-        self.log_handler = logging.StreamHandler(self.frame)
-        self.logger.addHandler(self.log_handler)
+        self.send_queue = SendQueue(self)
+        self.recorder = None
+        self.scrollback = Scrollback(self.config.output['scrollback_lines'])
+        # Records are tagged with the world, so they only reach its frame.
+        self.logger = logging.LoggerAdapter(logger, {'world': self})
+        self.cpu_time = 0.0
+        self.saved = None  # (filename, digest) of the last save or load.
+        self.saved_config = None  # The configuration as last saved or loaded.
+        # Set whenever things, classes or plugins change, so saving an
+        # unchanged world costs nothing. Call update after editing a thing.
+        self.dirty = True
+        self.store = None  # A ThingStore, when using a database.
+        application.worlds[id(self)] = self
         self._plugins = set()
-        self.plugins = set()
+        self.plugins = []
+        self.hooks = {}
+        self.asynchronous_hooks = {}
         for cls in application.global_plugins:
             self.load_plugin(cls)
 
     def save(self):
-        """Save this world."""
+        """
+        Save this world, returning True if anything was written.
+
+        The file is replaced atomically, so an interrupted save leaves the old
+        file intact, and is not written at all if nothing has changed since
+        the world was last saved or loaded. Unless trigger statistics are
+        saved, nothing is even dumped unless the configuration has changed
+        or dirty is True.
+
+        If the database option is set, triggers and aliases are stored in an
+        SQLite database next to the world file instead, and only those which
+        have changed are written.
+        """
         if not self.name:
             raise RuntimeError('Cannot save a world with no name.')
+        filename = os.path.join(world_dir, self.name + '.world')
+        config = self.config.json()
+        statistics = self.config.world['save_statistics']
+        if not self.dirty and not statistics and config == self.saved_config \
+                and self.saved is not None and self.saved[0] == filename \
+                and os.path.isfile(filename):
+            return False
         d = {}
-        d['config'] = self.config.json()
-        d['plugins'] = list(self._plugins)
-        d['classes'] = self.classes
-        d['triggers'] = []
-        for t in self.triggers + self.disabled:
-            if isinstance(t, Trigger):
-                d['triggers'].append(t.dump())
-        d['aliases'] = []
-        for a in self.aliases + self.disabled:
-            if isinstance(a, Alias):
-                d['aliases'].append(a)
+        d['config'] = config
+        d['plugins'] = sorted(self._plugins)
+        d['classes'] = sorted(self.classes)
+        triggers = []
+        aliases = []
+        order = self._order
+        for thing in sorted(
+            self.triggers + self.aliases + self.disabled,
+            key=lambda thing: order[id(thing)]
+        ):
+            things = aliases if isinstance(thing, Alias) else triggers
+            things.append(
+                (order[id(thing)], thing.dump(statistics=statistics))
+            )
         if not os.path.isdir(world_dir):
             os.makedirs(world_dir)
-        with open(
-            os.path.join(
-                world_dir,
-                self.name + '.world'
-            ),
-            'w'
-        ) as f:
-            dump(d, f, indent=4)
-
-    def load(self, filename, reset=True):
-        """Load a world from filename."""
-        with open(filename, 'r') as f:
-            data = load(f)
+        written = 0
+        if self.config.world['database']:
+            database = self.name + '.sqlite3'
+            path = os.path.join(world_dir, database)
+            if self.store is None or self.store.filename != path:
+                if self.store is not None:
+                    self.store.close()
+                self.store = ThingStore(path)
+            written += self.store.save('triggers', triggers)
+            written += self.store.save('aliases', aliases)
+            self.logger.debug('Wrote %d trigger(s) and alias(es).', written)
+            d['database'] = database
+        else:
+            d['triggers'] = [thing for key, thing in triggers]
+            d['aliases'] = [thing for key, thing in aliases]
+        data = dumps(d, indent=4).encode()
+        saved = (filename, digest(data))
+        if saved == self.saved and os.path.isfile(filename):
+            result = written > 0
+        else:
+            atomic_write(filename, data)
+            self.saved = saved
+            result = True
+        # Only forget the changes once everything has been written, so a
+        # failed save is tried again next time.
+        self.dirty = False
+        self.saved_config = config
+        return result
+
+    def load(self, filename, reset=True, connect=True):
+        """Load a world from filename, connecting if connect is True and a
+        hostname is configured."""
+        with open(filename, 'rb') as f:
+            data = f.read()
+        self.saved = (filename, digest(data))
+        data = loads(data)
         self.config.update(
             data.get('config', {}),
             ignore_missing_sections=False,
             ignore_missing_options=False)
+        self.scrollback.resize(self.config.output['scrollback_lines'])
         if reset:
             self.clear_things()
             self.classes.clear()
-        plugins = {cls.name: cls for cls in application.plugins}
+        plugins = {info.name: info for info in application.plugins.values()}
         for name in data.get('plugins', []):
-            if name in plugins:
-                self.load_plugin(plugins[name])
+            cls = plugins[name].get_class() if name in plugins else None
+            if cls is not None:
+                self.load_plugin(cls)
             else:
                 self.logger.warning('No plugin found matching %s.', name)
-        self.classes = data.get('classes', [])
-        for t in data.get('triggers', []):
-            self.add(Trigger(self, **t))
-        for a in data.get('aliases', []):
-            self.add(Alias(self, **a))
-        if self.config.connection['hostname']:
-            try:
-                self.connect()
-            except Exception as e:
-                self.logger.critical('While connecting a traceback occurred:')
-                self.logger.exception(e)
+        self.classes.update(data.get('classes', []))
+        if 'database' in data:
+            if self.store is not None:
+                self.store.close()
+            self.store = ThingStore(
+                os.path.join(os.path.dirname(filename), data['database'])
+            )
+            things = [
+                (key, Trigger, thing)
+                for key, thing in self.store.load('triggers')
+            ] + [
+                (key, Alias, thing)
+                for key, thing in self.store.load('aliases')
+            ]
+            # Keep the keys the rows are stored under, so the next save only
+            # writes the rows which have changed.
+            things.sort(key=lambda entry: entry[0])
+            for key, cls, thing in things:
+                self.add(cls(self, **thing), max(key, self._next_order))
         else:
-            self.logger.info(
-                'Not connecting with no connection configured.')
+            for t in data.get('triggers', []):
+                self.add(Trigger(self, **t))
+            for a in data.get('aliases', []):
+                self.add(Alias(self, **a))
+        if reset:
+            self.dirty = False  # Everything matches filename.
+        self.saved_config = self.config.json()
+        if connect:
+            if self.config.connection['hostname']:
+                try:
+                    self.connect()
+                except Exception as e:
+                    self.logger.critical(
+                        'While connecting a traceback occurred:')
+                    self.logger.exception(e)
+            else:
+                self.logger.info(
+                    'Not connecting with no connection configured.')
 
     def load_plugin(self, cls):
-        """Load the specified plugin onto this world."""
+        """Load the specified plugin onto this world, returning the new
+        instance."""
         name = cls.name
         self.logger.info('Loading plugin %s.', name)
         self._plugins.add(name)
+        self.dirty = True
         plugin = cls(self)
-        self.plugins.add(plugin)
+        self.plugins.append(plugin)
+        self.update_hooks()
+        return plugin
 
     def unload_plugin(self, plugin):
         """Unload the specified plugin from this world."""
-        for p in self.plugins:
+        for index, p in enumerate(self.plugins):
             if p is plugin or isinstance(p, plugin):
                 name = p.name
-                self.plugins.remove(p)
+                del self.plugins[index]
                 self.logger.info('Removing plugin %s.', name)
                 if name in self._plugins:
                     self._plugins.remove(name)
+                    self.dirty = True
+                self.update_hooks()
+                p.unloaded()
                 break
 
+    def update_hooks(self):
+        """Sort the loaded plugins by priority, and rebuild the lists of
+        plugins to call for each hook. Only plugins which override a hook are
+        called for it, and asynchronous hooks are kept in their own lists."""
+        self.plugins.sort(key=lambda plugin: plugin.priority)
+        synchronous = {}
+        asynchronous = {}
+        for hook in hooks:
+            for plugin in self.plugins:
+                if plugin.handles(hook):
+                    if plugin.is_asynchronous(hook):
+                        table = asynchronous
+                    else:
+                        table = synchronous
+                    table.setdefault(hook, []).append(plugin)
+        self.hooks = synchronous
+        self.asynchronous_hooks = asynchronous
+
     def connect(self):
         """Conect this world."""
         if not self.config.connection['hostname']:
@@ -131,38 +303,133 @@ class World:
         else:
             self.protocol.transport.loseConnection()
 
+    def start_recording(self, filename):
+        """Record everything received from the MUD to filename."""
+        self.stop_recording()
+        self.recorder = Recorder(filename)
+        self.logger.info('Recording to %s.', filename)
+
+    def stop_recording(self):
+        """Stop recording."""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.logger.info(
+                'Recorded %d chunks to %s.',
+                self.recorder.chunks,
+                self.recorder.filename
+            )
+            self.recorder = None
+
     def check_classes(self, classes):
         """Check the provided classes against the currently-loaded classes."""
-        return not classes or [c for c in classes if c in self.classes]
+        return not classes or not self.classes.isdisjoint(classes)
 
-    def add(self, thing):
-        """Add thing to the appropriate attribute of self. Just does
-        self.enable for the time being."""
+    def add(self, thing, order=None):
+        """Add thing to the appropriate attribute of self. Things are kept in
+        the order they were added, whatever classes are enabled. If given,
+        order is the key thing is ordered by, and must be higher than the
+        keys of everything added before."""
+        if order is None:
+            order = self._next_order
+        self._order[id(thing)] = order
+        self._next_order = order + 1
+        for cls in set(thing.classes):
+            self._class_index.setdefault(cls, []).append(thing)
         self.enable(thing)
 
     def enable(self, thing):
         """Enable or disable thing."""
+        if id(thing) not in self._order:
+            return self.add(thing)
+        self.dirty = True
         if self.check_classes(thing.classes):
-            if isinstance(thing, Trigger):
-                self.triggers.append(thing)
-            elif isinstance(thing, Alias):
-                self.aliases.append(thing)
+            if isinstance(thing, Alias):
+                self._insert(self.aliases, thing)
+                self.alias_set.add(thing, self._order[id(thing)])
+            elif isinstance(thing, Trigger):
+                self._insert(self.triggers, thing)
+                self.trigger_set.add(thing, self._order[id(thing)])
             else:
                 raise TypeError('No clue what to do with %r.' % thing)
         else:
-            self.disabled.append(self)
+            self._insert(self.disabled, thing)
+
+    def disable(self, thing):
+        """Move an enabled thing to the disabled list. Things which are
+        already disabled are left alone."""
+        if id(thing) not in self._order:
+            return  # Not added to this world.
+        if isinstance(thing, Alias):
+            things, thing_set = self.aliases, self.alias_set
+        else:
+            things, thing_set = self.triggers, self.trigger_set
+        position = self._position(things, thing)
+        if position == len(things) or things[position] is not thing:
+            return  # Already disabled.
+        self.dirty = True
+        del things[position]
+        thing_set.remove(self._order[id(thing)])
+        self._insert(self.disabled, thing)
+
+    def _position(self, things, thing):
+        """Return the index where thing belongs in the ordered list
+        things."""
+        order = self._order
+        key = order[id(thing)]
+        low, high = 0, len(things)
+        while low < high:
+            middle = (low + high) // 2
+            if order[id(things[middle])] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _insert(self, things, thing):
+        """Insert thing into the ordered list things."""
+        things.insert(self._position(things, thing), thing)
+
+    def _remove(self, things, thing):
+        """Remove thing from the ordered list things."""
+        position = self._position(things, thing)
+        assert things[position] is thing, '%r is not in the list.' % thing
+        del things[position]
 
     def enable_class(self, cls):
-        """Enable a class."""
-        self.classes.append(cls)
-        self.update()
+        """Enable a class, enabling only the things which belong to it."""
+        if cls in self.classes:
+            return
+        things = [
+            thing for thing in self._class_index.get(cls, ())
+            if not self.check_classes(thing.classes)
+        ]
+        self.classes.add(cls)
+        self.dirty = True
+        for thing in things:
+            self._remove(self.disabled, thing)
+            self.enable(thing)
 
     def disable_class(self, cls):
-        """Disable a class."""
-        self.classes.disable(self, cls)
-        self.update()
+        """Disable a class, disabling only the things which belong to it."""
+        if cls not in self.classes:
+            return
+        self.classes.remove(cls)
+        self.dirty = True
+        for thing in self._class_index.get(cls, ()):
+            if not self.check_classes(thing.classes):
+                self.disable(thing)
 
     def clear_things(self):
+        """Clear triggers, aliases and disabled items, resetting their
+        statistics."""
+        self.reset_statistics()
+        self._clear_things()
+        self.dirty = True
+        self._order.clear()
+        self._class_index.clear()
+        self._next_order = 0
+
+    def _clear_things(self):
         """Clear triggers, aliases and disabled items."""
         for attr in [
             self.triggers,
@@ -170,27 +437,101 @@ class World:
             self.disabled
         ]:
             attr.clear()
+        self.trigger_set.clear()
+        self.alias_set.clear()
 
     def update(self):
         """Update triggers and aliases, taking into account
-        self.check_classes."""
-        things = self.aliases + self.triggers + self.disabled
-        self.clear_things()
+        self.check_classes. Use this after changing the classes or patterns
+        of existing things."""
+        things = sorted(
+            self.aliases + self.triggers + self.disabled,
+            key=lambda thing: self._order[id(thing)]
+        )
+        self._clear_things()
+        self._class_index.clear()
+        self.dirty = True
         for thing in things:
+            for cls in set(thing.classes):
+                self._class_index.setdefault(cls, []).append(thing)
             self.enable(thing)
 
+    def reset_statistics(self):
+        """Reset the statistics of every trigger and alias."""
+        for thing in self.triggers + self.aliases + self.disabled:
+            thing.statistics.reset()
+
+    def statistics_report(self, count=None):
+        """Return a report of the count triggers and aliases which have taken
+        the most time, worst first."""
+        things = sorted(
+            self.triggers + self.aliases + self.disabled,
+            key=lambda thing: thing.statistics.total_time,
+            reverse=True
+        )
+        lines = []
+        for thing in things[:count]:
+            s = thing.statistics
+            lines.append(
+                '{} {}: {} hits from {} attempts, {:.3f}s matching, {:.3f}s '
+                'running.'.format(
+                    type(thing).__name__,
+                    thing.name or repr(thing.pattern),
+                    s.hits,
+                    s.attempts,
+                    s.match_time,
+                    s.run_time
+                )
+            )
+        return '\n'.join(lines)
+
     def send(self, line):
-        """Send a line to the MUD."""
-        reactor.callFromThread(self.protocol.sendLine, line.encode())
+        """Send a line to the MUD. Lines are queued, and sent according to
+        the command interval. Lines sent before the reactor gets round to
+        queueing them (by an alias which sends several commands, for
+        example) are handed over together, in one trip to the reactor
+        thread."""
+        data = line.encode(
+            self.config.connection['encoding'], errors='replace'
+        )
+        with self._outgoing_lock:
+            self._outgoing.append(data)
+            if len(self._outgoing) > 1:
+                return  # Already on its way.
+        reactor.callFromThread(self._queue_outgoing)
+
+    def _queue_outgoing(self):
+        """Move every line passed to send onto the send queue."""
+        with self._outgoing_lock:
+            commands = self._outgoing
+            self._outgoing = []
+        for command in commands:
+            self.send_queue.put(command)
+
+    def flush_commands(self):
+        """Send every queued command now."""
+        reactor.callFromThread(self.send_queue.flush)
+
+    def cancel_commands(self):
+        """Forget every queued command."""
+        def f():
+            self.logger.info(
+                'Cancelled %d queued command(s).', self.send_queue.cancel()
+            )
+        reactor.callFromThread(f)
 
     def handle_plugins(self, attr, *args, **kwargs):
-        """Pass args and kwargs to every plugin on this world with an
-        attribute named attr."""
-        for plugin in self.plugins:
+        """Pass args and kwargs to every plugin on this world which
+        overrides the hook named attr. Asynchronous hooks are called last,
+        with copies of any lines."""
+        call = self.timed_call if self.plugin_profiling else call_hook
+        for plugin in self.hooks.get(attr, ()):
             try:
-                getattr(plugin, attr)(*args, **kwargs)
+                result = call(plugin, attr, *args, **kwargs)
+                if result is not None:
+                    self.track_hook(plugin, attr, result)
             except StopPropagation:
-                break
+                return
             except Exception as e:
                 self.logger.warning(
                     'Calling %s(%r, %r) on plugin %s caused a traceback:',
@@ -200,6 +541,225 @@ class World:
                     plugin.name
                 )
                 self.logger.exception(e)
+        plugins = self.asynchronous_hooks.get(attr)
+        if plugins:
+            args = [
+                arg.copy() if isinstance(arg, Line) else arg for arg in args
+            ]
+            for plugin in plugins:
+                self.defer_hook(plugin, attr, *args, **kwargs)
+
+    def handle_plugins_batch(self, attr, lines):
+        """
+        Pass a batch of lines to every plugin on this world.
+
+        Plugins which override the batch version of attr get every line in one
+        call. The rest have attr called with each line in turn, and calling
+        stop from those only stops propagation for that line.
+
+        Asynchronous hooks are called last, with copies of the lines whose
+        propagation was not stopped.
+        """
+        batch_attr = batch_hooks[attr]
+        call = self.timed_call if self.plugin_profiling else call_hook
+        stopped = set()
+        for plugin in self.hooks.get(attr, ()):
+            try:
+                if plugin.overrides(batch_attr):
+                    result = call(
+                        plugin,
+                        batch_attr,
+                        [line for line in lines if id(line) not in stopped]
+                    )
+                    if result is not None:
+                        self.track_hook(plugin, batch_attr, result)
+                    continue
+            except StopPropagation:
+                return
+            except Exception as e:
+                self.logger.warning(
+                    'Calling %s on plugin %s caused a traceback:',
+                    batch_attr,
+                    plugin.name
+                )
+                self.logger.exception(e)
+                continue
+            for line in lines:
+                if id(line) in stopped:
+                    continue
+                try:
+                    result = call(plugin, attr, line)
+                    if result is not None:
+                        self.track_hook(plugin, attr, result)
+                except StopPropagation:
+                    stopped.add(id(line))
+                except Exception as e:
+                    self.logger.warning(
+                        'Calling %s(%r) on plugin %s caused a traceback:',
+                        attr,
+                        line,
+                        plugin.name
+                    )
+                    self.logger.exception(e)
+        plugins = self.asynchronous_hooks.get(attr)
+        if plugins:
+            lines = [line.copy() for line in lines if id(line) not in stopped]
+            if lines:
+                for plugin in plugins:
+                    self.defer_hook(plugin, batch_attr, lines)
+
+    def defer_hook(self, plugin, attr, *args, **kwargs):
+        """Call the hook named attr on plugin in the reactor's thread pool,
+        unless plugin already has max_pending calls waiting, in which case
+        the call is dropped. Safe to call from any thread."""
+        if not isInIOThread():
+            return reactor.callFromThread(
+                self.defer_hook, plugin, attr, *args, **kwargs
+            )
+        if plugin.pending >= plugin.max_pending:
+            plugin.dropped += 1
+            return
+        started = perf_counter()
+        result = deferToThread(getattr(plugin, attr), *args, **kwargs)
+        if self.plugin_profiling:
+            result.addBoth(self.record_time, plugin, attr, started)
+        self.track_hook(plugin, attr, result)
+
+    def track_hook(self, plugin, attr, result):
+        """
+        Track result, as returned by the hook named attr on plugin, if it is
+        a Deferred or a coroutine. Results beyond plugin.max_pending are
+        cancelled. Safe to call from any thread.
+
+        Coroutines are run up to their first await straight away. If result
+        has already failed with StopPropagation (as it will if a coroutine
+        calls stop before its first await), StopPropagation is raised here.
+        """
+        if iscoroutine(result):
+            result = ensureDeferred(result)
+        elif not isinstance(result, Deferred):
+            return
+        if result.called:
+            stops = []
+            result.addErrback(trap_stop, stops)
+            if stops:
+                raise stops[0]
+        if not isInIOThread():
+            return reactor.callFromThread(
+                self.track_hook, plugin, attr, result
+            )
+        if plugin.pending >= plugin.max_pending:
+            plugin.dropped += 1
+            result.addErrback(lambda failure: failure.trap(CancelledError))
+            return result.cancel()
+        plugin.pending += 1
+        plugin.peak_pending = max(plugin.peak_pending, plugin.pending)
+
+        def done(result):
+            plugin.pending -= 1
+            plugin.completed += 1
+            if isinstance(result, Failure) and \
+                    not result.check(StopPropagation, CancelledError):
+                self.logger.warning(
+                    'Calling %s on plugin %s caused a traceback:',
+                    attr,
+                    plugin.name
+                )
+                self.logger.error(result.getTraceback())
+
+        result.addBoth(done)
+
+    def timed_call(self, plugin, attr, *args, **kwargs):
+        """Call the hook named attr on plugin, adding the time it takes to
+        plugin_statistics, and warning if it is slower than the slow_call
+        option. Coroutines are run up to their first await, and they and
+        Deferreds are timed when they finish."""
+        started = perf_counter()
+        result = None
+        try:
+            result = getattr(plugin, attr)(*args, **kwargs)
+            if iscoroutine(result):
+                result = ensureDeferred(result)
+            return result
+        finally:
+            if isinstance(result, Deferred):
+                result.addBoth(self.record_time, plugin, attr, started)
+            else:
+                self.record_time(None, plugin, attr, started)
+
+    def record_time(self, result, plugin, attr, started):
+        """Add the time since started to the histogram for the hook named
+        attr on plugin, and return result, so this can be used as a
+        callback."""
+        taken = perf_counter() - started
+        key = (plugin.name, attr)
+        histogram = self.plugin_statistics.get(key)
+        if histogram is None:
+            histogram = self.plugin_statistics[key] = Histogram()
+        histogram.add(taken)
+        slow_call = self.config.plugins['slow_call']
+        if slow_call and taken > slow_call:
+            self.logger.warning(
+                'Calling %s on plugin %s took %.3f seconds.',
+                attr,
+                plugin.name,
+                taken
+            )
+        return result
+
+    def reset_plugin_statistics(self):
+        """Forget the time taken by every plugin."""
+        self.plugin_statistics.clear()
+
+    def dump_plugin_statistics(self):
+        """Return the time taken by every plugin as a dictionary of plugin
+        names, mapped to dictionaries of hook names and histograms. Plugins
+        which have made asynchronous calls also have their queue statistics
+        under the "queue" key."""
+        d = {}
+        for (name, attr), histogram in self.plugin_statistics.items():
+            d.setdefault(name, {})[attr] = histogram.dump()
+        for plugin in self.plugins:
+            if plugin.peak_pending or plugin.dropped:
+                d.setdefault(plugin.name, {})[
+                    'queue'
+                ] = plugin.queue_statistics()
+        return d
+
+    def plugin_statistics_report(self):
+        """Return a report of the time taken by every plugin hook, slowest
+        first."""
+        lines = []
+        for (name, attr), histogram in sorted(
+            self.plugin_statistics.items(),
+            key=lambda item: item[1].total,
+            reverse=True
+        ):
+            lines.append(
+                '{} {}: {} calls, {:.3f}s total, {:.6f}s p50, {:.6f}s p99, '
+                '{:.6f}s max.'.format(
+                    name,
+                    attr,
+                    histogram.count,
+                    histogram.total,
+                    histogram.percentile(50),
+                    histogram.percentile(99),
+                    histogram.maximum
+                )
+            )
+        for plugin in self.plugins:
+            if plugin.peak_pending or plugin.dropped:
+                lines.append(
+                    '{} queue: {} pending (peak {}), {} completed, {} '
+                    'dropped.'.format(
+                        plugin.name,
+                        plugin.pending,
+                        plugin.peak_pending,
+                        plugin.completed,
+                        plugin.dropped
+                    )
+                )
+        return '\n'.join(lines)
 
     @property
     def name(self):
@@ -210,7 +770,6 @@ class World:
     def name(self, value):
         """Set the name of this world."""
         self.config.world['name'] = value
-        self.log_handler.set_name(self.name)
         self.frame.SetTitle(self.name)
 
     @property
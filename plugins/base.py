@@ -1,12 +1,39 @@
 """Contains the Plugin class."""
 
-from attr import attrs, attrib
+from attr import attrs, attrib, Factory
+
+
+# The names of the hooks worlds call.
+hooks = ('line_received', 'pre_write', 'command_entered', 'pre_send')
+
+# Hooks which take a single line, mapped to the names of their batch
+# versions which take a list of lines.
+batch_hooks = {
+    'line_received': 'lines_received',
+    'pre_write': 'pre_write_lines'
+}
 
 
 class StopPropagation(StopIteration):
     """Stop hook propagation this round."""
 
 
+def asynchronous(func):
+    """
+    Mark a hook as asynchronous.
+
+    Asynchronous hooks are called in the reactor's thread pool, after every
+    synchronous hook has run. They are given copies of any lines, so they
+    cannot gag or substitute them, or stop propagation. Use world.send, or
+    reactor.callFromThread, to act on the world from an asynchronous hook.
+
+    Hooks which can be marked are line_received, pre_write,
+    command_entered, pre_send, and the batch hooks.
+    """
+    func.asynchronous = True
+    return func
+
+
 @attrs
 class Plugin:
     """
@@ -17,11 +44,31 @@ class Plugin:
 
     Remember to set name and description on the class so they can be found by
     the plugin machinery.
+
+    Plugins with lower priorities have their hooks called first. Plugins with
+    the same priority are called in the order they were loaded.
+
+    Hooks may return a Deferred, or be coroutines (async def). Coroutines are
+    run up to their first await as soon as they are called. Only that part
+    can gag or substitute lines, or stop propagation; by the time the rest
+    runs, the line has been written. Hooks which block should be marked with
+    the asynchronous decorator instead.
+
+    At most max_pending asynchronous calls and unfinished Deferreds are
+    tracked for each plugin. Beyond that, new calls are dropped, and
+    Deferreds are cancelled. The pending, peak_pending, completed and dropped
+    attributes count them.
     """
 
     world = attrib()
+    pending = attrib(default=Factory(int), init=False)
+    peak_pending = attrib(default=Factory(int), init=False)
+    completed = attrib(default=Factory(int), init=False)
+    dropped = attrib(default=Factory(int), init=False)
     name = 'Generic Plugin'
     description = 'This plugin needs a proper description.'
+    priority = 0
+    max_pending = 100
 
     def __attrs_post_init__(self):
         self.world.logger.info('Initialised: %r.', self)
@@ -34,6 +81,36 @@ class Plugin:
                 self, message)
         raise StopPropagation(message)
 
+    @classmethod
+    def overrides(cls, attr):
+        """Return whether this plugin overrides the hook named attr."""
+        return getattr(cls, attr) is not getattr(Plugin, attr)
+
+    @classmethod
+    def handles(cls, hook):
+        """Return whether this plugin overrides hook, or its batch version
+        if it has one."""
+        return cls.overrides(hook) or (
+            hook in batch_hooks and cls.overrides(batch_hooks[hook])
+        )
+
+    @classmethod
+    def is_asynchronous(cls, hook):
+        """Return whether the method which handles hook has been marked
+        with the asynchronous decorator."""
+        if hook in batch_hooks and cls.overrides(batch_hooks[hook]):
+            hook = batch_hooks[hook]
+        return getattr(getattr(cls, hook), 'asynchronous', False)
+
+    def queue_statistics(self):
+        """Return the counts of asynchronous calls as a dictionary."""
+        return {
+            'pending': self.pending,
+            'peak_pending': self.peak_pending,
+            'completed': self.completed,
+            'dropped': self.dropped
+        }
+
     def line_received(self, line):
         """
         The provided line was received by the world this plugin is attached to.
@@ -42,6 +119,18 @@ class Plugin:
         """
         pass
 
+    def lines_received(self, lines):
+        """
+        A batch of lines was received by the world this plugin is attached to.
+
+        Override this instead of line_received to handle every line from a
+        single read at once. Calling stop stops the whole batch.
+
+        lines - A list of line.Line instances.
+        """
+        for line in lines:
+            self.line_received(line)
+
     def pre_write(self, line):
         """
     The world is about to write the provided line to it's output.
@@ -52,6 +141,28 @@ class Plugin:
         """
         pass
 
+    def pre_write_lines(self, lines):
+        """
+        The world is about to write the provided batch of lines to it's
+        output.
+
+        Override this instead of pre_write to handle every line from a single
+        read at once. Calling stop stops the whole batch.
+
+        lines - A list of line.Line instances.
+        """
+        for line in lines:
+            self.pre_write(line)
+
+    def unloaded(self):
+        """
+        This plugin has been unloaded from its world, or replaced because its
+        module was reloaded.
+
+        Stop any timers the plugin has started here.
+        """
+        pass
+
     def command_entered(self, line):
         """
         A command was entered by the user in the attached world.
@@ -1,5 +1,6 @@
 """Allow jinja2 parsing of commands."""
 
+from functools import lru_cache
 import application
 from jinja2 import Environment
 from .base import Plugin
@@ -8,6 +9,20 @@ environment = Environment()
 
 environment.globals['application'] = application
 
+# Commands without any of these are sent as they are.
+markers = (
+    environment.variable_start_string,
+    environment.block_start_string,
+    environment.comment_start_string
+)
+
+
+@lru_cache(maxsize=256)
+def get_template(text):
+    """Return text compiled as a template. The most recently used templates
+    are cached, so repeated commands are only compiled once."""
+    return environment.from_string(text)
+
 
 class Jinja2Plugin(Plugin):
     name = 'Jinja2'
@@ -15,6 +30,5 @@ class Jinja2Plugin(Plugin):
 
     def pre_send(self, line):
         text = line.get_text()
-        if text is not None:
-            template = environment.from_string(text)
-            line.substitute(template.render(world=self.world))
+        if text is not None and any(marker in text for marker in markers):
+            line.substitute(get_template(text).render(world=self.world))
@@ -0,0 +1,112 @@
+"""Continuously measures lag (assuming the server supports the echo
+command)."""
+
+from collections import deque
+from itertools import count
+from time import perf_counter
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from muddle.recording import percentile
+from .base import Plugin
+
+tokens = count(1)
+
+
+class LatencyMonitorPlugin(Plugin):
+    name = 'Latency Monitor'
+    description = 'Measure lag continuously with the echo command, and show ' \
+        'it in the status bar. Type latency to hear the full statistics.'
+    interval = 10.0  # Seconds between probes.
+    timeout = 30.0  # Probes not echoed after this many seconds are lost.
+    window = 100  # The number of round trips the statistics are based on.
+    mud_cmd = 'echo'
+    cmd = 'latency'
+
+    def __init__(self, world):
+        super(LatencyMonitorPlugin, self).__init__(world)
+        self.sent = {}  # Tokens, mapped to the times they were sent.
+        self.samples = deque(maxlen=self.window)
+        self.probes = 0
+        self.received = 0
+        self.lost = 0
+        self.loop = LoopingCall(self.probe)
+        reactor.callFromThread(self.loop.start, self.interval, now=False)
+
+    def unloaded(self):
+        reactor.callFromThread(self.stop_probing)
+
+    def stop_probing(self):
+        """Stop sending probes."""
+        if self.loop.running:
+            self.loop.stop()
+
+    def probe(self):
+        """Send a probe, and count any which have timed out as lost."""
+        now = perf_counter()
+        for token, started in list(self.sent.items()):
+            if now - started > self.timeout:
+                del self.sent[token]
+                self.lost += 1
+        protocol = self.world.protocol
+        if protocol is None or not protocol.connected:
+            return
+        token = 'latency-probe-{}'.format(next(tokens))
+        self.sent[token] = now
+        self.probes += 1
+        protocol.sendLine(
+            '{} {}'.format(self.mud_cmd, token).encode(
+                self.world.config.connection['encoding']
+            )
+        )
+
+    def lines_received(self, lines):
+        if not self.sent:
+            return
+        for line in lines:
+            text = line.get_text()
+            started = self.sent.pop(text.strip(), None) if text else None
+            if started is not None:
+                line.gag()
+                self.samples.append(perf_counter() - started)
+                self.received += 1
+                self.world.frame.set_status(self.summary())
+
+    def statistics(self):
+        """Return the latest statistics as a dictionary. Times are in
+        seconds, and loss is a fraction of the probes which were answered or
+        timed out."""
+        samples = list(self.samples)
+        ordered = sorted(samples)
+        jitter = 0.0
+        if len(samples) > 1:
+            jitter = sum(
+                abs(a - b) for a, b in zip(samples, samples[1:])
+            ) / (len(samples) - 1)
+        finished = self.received + self.lost
+        return {
+            'last': samples[-1] if samples else 0.0,
+            'p50': percentile(ordered, 50),
+            'p95': percentile(ordered, 95),
+            'p99': percentile(ordered, 99),
+            'jitter': jitter,
+            'loss': self.lost / finished if finished else 0.0,
+            'probes': self.probes,
+            'lost': self.lost
+        }
+
+    def summary(self):
+        """Return the statistics as a short string."""
+        statistics = self.statistics()
+        return 'Lag: {:.0f} ms, p95 {:.0f} ms, jitter {:.0f} ms, loss ' \
+            '{:.0%}.'.format(
+                statistics['last'] * 1000,
+                statistics['p95'] * 1000,
+                statistics['jitter'] * 1000,
+                statistics['loss']
+            )
+
+    def command_entered(self, line):
+        if line.text == self.cmd:
+            self.world.frame.write(self.summary())
+            line.gag()
+            self.stop()
@@ -1,18 +1,29 @@
 """This module speaks any ungagged incoming lines."""
 
 from .base import Plugin
-from muddle.accessibility import system
+from muddle.accessibility import speech_queue
 
 
 class SpeakLinePlugin(Plugin):
     name = 'Speak Lines'
     description = 'Automatically speak lines before they are printed. Can be '
     'avoided by setting a dont_speak attribute.'
+    priority = 100  # Speak lines after other plugins have gagged them.
 
-    def pre_write(self, line):
-        text = line.get_text()
-        # Ignore gagged lines:
-        if text is not None and not getattr(line, 'dont_speak', False):
-            text = text.strip()
-            if text:
-                system.speak(text)
+    def pre_write_lines(self, lines):
+        texts = []
+        for line in lines:
+            text = line.get_text()
+            # Ignore gagged lines:
+            if text is not None and not line.dont_speak:
+                text = text.strip()
+                if text:
+                    texts.append(text)
+        if texts:
+            config = self.world.config.speech
+            speech_queue.chars_per_second = config['chars_per_second']
+            speech_queue.extend(texts, priority=config['priority'])
+
+    def command_entered(self, line):
+        if self.world.config.speech['interrupt']:
+            speech_queue.interrupt()
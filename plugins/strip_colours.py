@@ -1,17 +1,15 @@
 """Strip colours from output."""
 
-import re
 from .base import Plugin
-
-escape = chr(27)
-colour_re = re.compile(r'(%s\[[0-9]+m)' % escape)
+from muddle.ansi import strip
 
 
 class StripColoursPlugin(Plugin):
     name = 'Strip Colours'
-    description = 'Strip colour tags from the output.'
+    description = 'Strip colour codes from substituted output. Received ' \
+        'lines are always stripped.'
 
-    def line_received(world, line):
-        text = line.get_text()
-        if text:
-            line.text = re.sub(colour_re, '', text)
+    def pre_write(self, line):
+        text = line.get_text()  # None if the line is gagged.
+        if text is not None and line.substituted():
+            line.substitute(strip(text))
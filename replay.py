@@ -0,0 +1,57 @@
+"""Replay recordings through the line pipeline, and report how fast they
+were processed."""
+
+if __name__ == '__main__':
+    from default_argparse import parser
+    parser.add_argument(
+        'recordings',
+        metavar='RECORDING',
+        nargs='+',
+        help='The recordings to replay'
+    )
+    parser.add_argument(
+        '--world',
+        metavar='WORLD-FILE',
+        help='The world file whose triggers and plugins should be used'
+    )
+    parser.add_argument(
+        '--real-time',
+        action='store_true',
+        help='Replay at the speed the recordings were made'
+    )
+    args = parser.parse_args()
+    import logging
+    logging.basicConfig(
+        stream=args.log_file,
+        level=args.log_level,
+        format=args.log_format)
+    import application
+    from muddle.world import World
+    from muddle.headless import NullOutput
+    from muddle.recording import replay, measure_memory
+    application.reload_plugins()
+
+    def create_world():
+        world = World(NullOutput())
+        if args.world is not None:
+            world.load(args.world, connect=False)
+        return world
+
+    for filename in args.recordings:
+        stats = replay(filename, create_world(), real_time=args.real_time)
+        allocated, peak = measure_memory(filename, create_world())
+        print(
+            '{}: {lines} lines in {chunks} chunks, {seconds:.3f} seconds, '
+            '{lines_per_second:.0f} lines per second, {line_mean_us:.1f} us '
+            'per line, line latency (the time taken by its chunk) p50 '
+            '{p50_us:.1f} us, p99 {p99_us:.1f} us, {allocated} bytes '
+            'allocated ({peak} peak).'.format(
+                filename,
+                line_mean_us=stats['line_mean'] * 1000000,
+                p50_us=stats['p50'] * 1000000,
+                p99_us=stats['p99'] * 1000000,
+                allocated=allocated,
+                peak=peak,
+                **stats
+            )
+        )
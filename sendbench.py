@@ -0,0 +1,28 @@
+"""Time sending commands, with and without the Jinja2 plugin loaded."""
+
+if __name__ == '__main__':
+    from default_argparse import parser
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=100000,
+        help='The number of commands to send each time'
+    )
+    args = parser.parse_args()
+    import logging
+    logging.basicConfig(
+        stream=args.log_file,
+        level=args.log_level,
+        format=args.log_format)
+    from muddle.send_benchmark import run
+    from plugins.jinja2 import Jinja2Plugin
+    for title, plugins in (
+        ('Without plugins', ()),
+        ('With Jinja2', (Jinja2Plugin,))
+    ):
+        results = run(count=args.count, plugins=plugins)
+        print(
+            '{}: {sent} of {commands} commands sent ({bytes} bytes) in '
+            '{seconds:.3f} seconds, {sends_per_second:.0f} per '
+            'second.'.format(title, **results)
+        )
@@ -0,0 +1,16 @@
+"""Shared test fixtures."""
+
+import os.path
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from muddle.headless import NullOutput  # noqa: E402
+from muddle.world import World  # noqa: E402
+
+
+@pytest.fixture
+def world():
+    """A world with no window."""
+    return World(NullOutput())
@@ -0,0 +1,28 @@
+"""Test the speech queue."""
+
+from time import monotonic, sleep
+from muddle.accessibility import SpeechQueue
+
+
+class Output:
+    """Records what would have been spoken."""
+
+    def __init__(self):
+        self.texts = []
+
+    def speak(self, text, interrupt=False):
+        self.texts.append(text)
+
+
+def test_rate():
+    output = Output()
+    queue = SpeechQueue(output=output, chars_per_second=1000.0)
+    started = monotonic()
+    while monotonic() - started < 0.5:
+        queue.extend(['x' * 50] * 2)  # 400 lines per second.
+        sleep(0.005)
+    elapsed = monotonic() - started
+    spoken = sum(len(text) for text in output.texts)
+    # Only the first utterance is spoken without waiting first.
+    assert spoken <= 1000.0 * elapsed + queue.max_length
+    assert queue.dropped
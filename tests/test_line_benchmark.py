@@ -0,0 +1,44 @@
+"""Time making lines from received bytes, both when every line is read and
+when lines are gagged without their text being looked at, as raw triggers
+do."""
+
+from time import perf_counter
+from muddle.line import Line
+
+line_count = 100000
+data = [
+    '\x1b[1;32mYou see goblin number {}.\x1b[0m'.format(number).encode()
+    for number in range(line_count)
+]
+
+
+def make_lines(read):
+    """Make a line from each item in data, then either read its text or gag
+    it. Return the seconds taken."""
+    started = perf_counter()
+    for raw in data:
+        line = Line(raw)
+        if read:
+            line.get_text()
+        else:
+            line.gag()
+    return perf_counter() - started
+
+
+def test_line_benchmark():
+    read = make_lines(True)
+    gagged = make_lines(False)
+    print(
+        'Made {} lines in {:.3f} seconds reading their text, and {:.3f} '
+        'seconds gagging them ({:.2f} and {:.2f} microseconds per '
+        'line).'.format(
+            line_count, read, gagged, read / line_count * 1e6,
+            gagged / line_count * 1e6
+        )
+    )
+    assert gagged < read
+
+
+def test_encoding():
+    line = Line('caf\xe9'.encode('latin-1'), encoding='latin-1')
+    assert line.get_text() == 'caf\xe9'
@@ -0,0 +1,48 @@
+"""Time loading a world with 5,000 triggers, with and without compiling
+every pattern and body up front, as loading did before compilation was
+lazy."""
+
+from json import dump
+from time import perf_counter
+from muddle.headless import NullOutput
+from muddle.world import World
+
+trigger_count = 5000
+
+
+def make_world_file(filename):
+    """Write a world with trigger_count distinct triggers to filename."""
+    triggers = [
+        {
+            'name': 'Trigger {}'.format(number),
+            'pattern': r'^You see (\w+) number {}$'.format(number),
+            'code': 'local number = {}\nreturn args[1]'.format(number)
+        } for number in range(trigger_count)
+    ]
+    with open(filename, 'w') as f:
+        dump({'triggers': triggers}, f)
+
+
+def load(filename, compile_all=False):
+    """Load filename into a new world, returning (world, seconds taken)."""
+    started = perf_counter()
+    world = World(NullOutput())
+    world.load(filename, connect=False)
+    if compile_all:
+        for trigger in world.triggers:
+            trigger.get_pattern()
+            trigger.get_func()
+    return world, perf_counter() - started
+
+
+def test_load_benchmark(tmp_path):
+    filename = str(tmp_path / 'benchmark.world')
+    make_world_file(filename)
+    world, lazy = load(filename)
+    assert len(world.triggers) == trigger_count
+    world, eager = load(filename, compile_all=True)
+    print(
+        'Loaded {} triggers in {:.3f} seconds ({:.3f} seconds compiling '
+        'everything).'.format(trigger_count, lazy, eager)
+    )
+    assert lazy < eager
@@ -0,0 +1,85 @@
+"""Test plugins."""
+
+from twisted.internet.defer import Deferred
+from muddle.line import Line
+from plugins.base import Plugin, asynchronous
+from plugins.strip_colours import StripColoursPlugin
+
+
+def test_strip_colours(world):
+    plugin = StripColoursPlugin(world)
+    line = Line('Hello.')
+    line.substitute('\x1b[31mRed.\x1b[0m')
+    plugin.pre_write(line)
+    assert line.get_text() == 'Red.'
+    line.gag()
+    plugin.pre_write(line)
+    assert line.gagged()
+
+
+class StoppingPlugin(Plugin):
+    name = 'Stopping'
+    waiting = None
+
+    async def command_entered(self, line):
+        if line.text == 'stop':
+            self.stop()
+        self.waiting = Deferred()
+        await self.waiting
+        self.stop()  # Too late.
+
+
+class LaterPlugin(Plugin):
+    name = 'Later'
+    priority = 1
+    lines = []
+
+    def command_entered(self, line):
+        self.lines.append(line.text)
+
+
+def test_coroutine_stop(world):
+    stopping = world.load_plugin(StoppingPlugin)
+    later = world.load_plugin(LaterPlugin)
+    world.handle_plugins('command_entered', Line('stop'))
+    assert later.lines == []
+    world.handle_plugins('command_entered', Line('go'))
+    assert later.lines == ['go']
+    stopping.waiting.callback(None)
+    assert stopping.pending == 0
+
+
+def test_deferred_timing(world):
+    world.plugin_profiling = True
+    stopping = world.load_plugin(StoppingPlugin)
+    world.handle_plugins('command_entered', Line('go'))
+    key = ('Stopping', 'command_entered')
+    assert key not in world.plugin_statistics
+    stopping.waiting.callback(None)
+    assert world.plugin_statistics[key].count == 1
+
+
+class ThreadedPlugin(Plugin):
+    name = 'Threaded'
+
+    @asynchronous
+    def command_entered(self, line):
+        pass
+
+
+def test_thread_timing(world, monkeypatch):
+    calls = []
+
+    def defer_to_thread(func, *args, **kwargs):
+        calls.append(Deferred())
+        return calls[-1]
+
+    monkeypatch.setattr('muddle.world.deferToThread', defer_to_thread)
+    monkeypatch.setattr('muddle.world.isInIOThread', lambda: True)
+    world.plugin_profiling = True
+    world.load_plugin(ThreadedPlugin)
+    world.handle_plugins('command_entered', Line('go'))
+    key = ('Threaded', 'command_entered')
+    assert key not in world.plugin_statistics
+    calls[0].callback(None)
+    assert world.plugin_statistics[key].count == 1
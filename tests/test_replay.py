@@ -0,0 +1,21 @@
+"""Replay the sample recording, which was made with the fake MUD server
+(muddle/fake_server.py) offering compression."""
+
+import os.path
+from muddle.headless import NullOutput
+from muddle.recording import replay, measure_memory
+from muddle.world import World
+
+sample = os.path.join(os.path.dirname(__file__), 'data', 'sample.recording')
+
+
+def test_replay(world):
+    stats = replay(sample, world)
+    assert stats['lines'] == 3514
+    assert world.protocol.telnet.compressing
+    assert stats['line_mean'] <= stats['p99']
+
+
+def test_measure_memory():
+    allocated, peak = measure_memory(sample, World(NullOutput()))
+    assert 0 < allocated <= peak
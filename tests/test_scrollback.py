@@ -0,0 +1,61 @@
+"""Test the scrollback."""
+
+import random
+from muddle.scrollback import Scrollback
+
+vocabulary = ['dragon', 'dragons', 'firedragon', 'red', 'orc', 'hits', 'you']
+
+
+def naive_find(scrollback, text, start, backwards):
+    """Find text by looking at every line."""
+    if backwards:
+        numbers = range(start - 1, scrollback.first - 1, -1)
+    else:
+        numbers = range(max(start + 1, scrollback.first), scrollback.end)
+    for number in numbers:
+        if text.lower() in scrollback.get(number)[1].lower():
+            return number
+
+
+def test_find():
+    random.seed(0)
+    scrollback = Scrollback(200)
+    for number in range(500):
+        scrollback.append(
+            ' '.join(random.choice(vocabulary) for word in range(3))
+        )
+    for text in (
+        'dragon', 'Dragon', 'ragon', 'agons', 'red drag', 'gon orc', 're',
+        'dragon red', 'fire', 'missing'
+    ):
+        for start in range(scrollback.first - 1, scrollback.end + 1, 17):
+            for backwards in (False, True):
+                assert scrollback.find(
+                    text, start=start, backwards=backwards
+                ) == naive_find(scrollback, text, start, backwards)
+
+
+def test_find_checks_candidates_only():
+    scrollback = Scrollback(200000)
+    for number in range(200000):
+        scrollback.append('word{} word{}'.format(number, number % 1000))
+    scrollback.append('A red dragon roars.')
+    tests = [
+        (text, backwards, naive_find(
+            scrollback, text,
+            scrollback.end if backwards else scrollback.first - 1, backwards
+        )) for text in ('dragon', 'red drag', 'agon', 'word199999 word9')
+        for backwards in (False, True)
+    ]
+    checked = []
+    get = scrollback.get
+
+    def counting_get(number):
+        checked.append(number)
+        return get(number)
+
+    scrollback.get = counting_get
+    for text, backwards, expected in tests:
+        checked.clear()
+        assert scrollback.find(text, backwards=backwards) == expected
+        assert len(checked) <= 10  # Out of 200,001 lines.
@@ -0,0 +1,20 @@
+"""Time sending commands, with and without the Jinja2 plugin loaded."""
+
+from muddle.send_benchmark import run
+from plugins.jinja2 import Jinja2Plugin
+
+count = 20000
+
+
+def test_send_benchmark():
+    plain = run(count=count)
+    jinja2 = run(count=count, plugins=(Jinja2Plugin,))
+    for title, results in (('Without plugins', plain), ('Jinja2', jinja2)):
+        print(
+            '{}: {sends_per_second:.0f} commands per second.'.format(
+                title, **results
+            )
+        )
+    assert plain['sent'] == jinja2['sent'] == count
+    # Templates are rendered, so the Jinja2 commands are shorter.
+    assert jinja2['bytes'] < plain['bytes']
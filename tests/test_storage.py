@@ -0,0 +1,97 @@
+"""Test saving worlds."""
+
+import os
+import stat
+import pytest
+from muddle.headless import NullOutput
+from muddle.storage import ThingStore, atomic_write
+from muddle.triggers import Trigger, Alias
+from muddle.world import World
+
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    """A named world which saves to tmp_path."""
+    monkeypatch.setattr('muddle.world.world_dir', str(tmp_path))
+    world = World(NullOutput())
+    world.name = 'Test World'
+    return world
+
+
+def test_atomic_write_keeps_mode(tmp_path):
+    filename = str(tmp_path / 'test.world')
+    atomic_write(filename, b'first')
+    os.chmod(filename, 0o640)
+    atomic_write(filename, b'second')
+    assert stat.S_IMODE(os.stat(filename).st_mode) == 0o640
+    with open(filename, 'rb') as f:
+        assert f.read() == b'second'
+
+
+def test_unchanged(world, monkeypatch):
+    world.add(Trigger(world, pattern='hello'))
+    assert world.save()
+
+    def dump(*args, **kwargs):
+        raise AssertionError('Dumped an unchanged world.')
+
+    monkeypatch.setattr(Trigger, 'dump', dump)
+    assert not world.save()
+    world.enable_class('combat')
+    with pytest.raises(AssertionError):
+        world.save()
+
+
+def test_rows_keyed_by_order(world, tmp_path, monkeypatch):
+    written = []
+    save = ThingStore.save
+
+    def spy(self, kind, things):
+        written.append(save(self, kind, things))
+        return written[-1]
+
+    monkeypatch.setattr(ThingStore, 'save', spy)
+    world.config.world['database'] = True
+    for number in range(5):
+        world.add(
+            Trigger(
+                world, pattern=str(number),
+                classes=['odd'] if number % 2 else []
+            )
+        )
+        world.add(Alias(world, pattern='alias {}'.format(number)))
+    world.enable_class('odd')
+    world.save()
+    assert written == [5, 5]
+    rows = dict(world.store.rows)
+    world.disable_class('odd')
+    world.save()
+    assert written[2:] == [0, 0]
+    world.add(Trigger(world, pattern='new'))
+    world.save()
+    assert written[4:] == [1, 0]
+    assert len(world.store.rows) == len(rows) + 1
+    rows = dict(world.store.rows)
+    loaded = World(NullOutput())
+    loaded.load(str(tmp_path / 'Test World.world'), connect=False)
+    assert [t.pattern for t in loaded.triggers] == ['0', '2', '4', 'new']
+    assert loaded.store.rows == rows
+    assert not loaded.save()
+
+
+def test_failed_save(world, tmp_path, monkeypatch):
+    world.add(Trigger(world, pattern='first'))
+    assert world.save()
+    world.add(Trigger(world, pattern='second'))
+
+    def fail(filename, data):
+        raise OSError('No space left on device.')
+
+    monkeypatch.setattr('muddle.world.atomic_write', fail)
+    with pytest.raises(OSError):
+        world.save()
+    monkeypatch.setattr('muddle.world.atomic_write', atomic_write)
+    assert world.save()
+    loaded = World(NullOutput())
+    loaded.load(str(tmp_path / 'Test World.world'), connect=False)
+    assert [t.pattern for t in loaded.triggers] == ['first', 'second']
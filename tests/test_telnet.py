@@ -0,0 +1,83 @@
+"""Test telnet negotiation and MCCP against the fake MUD server."""
+
+from twisted.internet.testing import StringTransport
+from muddle.fake_server import FakeMudFactory
+from muddle.headless import NullOutput
+from muddle.protocol import Protocol
+from muddle.telnet import Telnet, IAC, WILL, WONT, DO, DONT, MCCP2, MCCP3
+from muddle.world import World
+
+
+def connect(world, compression=True):
+    """Connect world to a fake MUD, returning (factory, server, client)."""
+    factory = FakeMudFactory(rate=0, compression=compression)
+    server = factory.buildProtocol(None)
+    client = Protocol(world)
+    client.makeConnection(StringTransport())
+    server.makeConnection(StringTransport())
+    return factory, server, client
+
+
+def pump(server, client):
+    """Move data between server and client until neither has anything to
+    send. Returns the number of bytes the client received."""
+    received = 0
+    while True:
+        to_client = server.transport.value()
+        server.transport.clear()
+        to_server = client.transport.value()
+        client.transport.clear()
+        if not to_client and not to_server:
+            return received
+        received += len(to_client)
+        if to_client:
+            client.dataReceived(to_client)
+        if to_server:
+            server.dataReceived(to_server)
+
+
+def test_mccp2(world):
+    factory, server, client = connect(world)
+    pump(server, client)
+    assert client.telnet.compressing
+    factory.send_lines(100)
+    pump(server, client)
+    assert len(world.scrollback) == 101  # Including the welcome message.
+    assert client.telnet.decompressed > client.telnet.received
+
+
+def test_refused(world):
+    factory, server, client = connect(world, compression=False)
+    pump(server, client)
+    assert not client.telnet.compressing
+    factory.send_lines(10)
+    pump(server, client)
+    assert len(world.scrollback) == 11
+
+
+def test_state_changes_answered_once():
+    written = []
+    telnet = Telnet(written.append)
+    telnet.receive(bytes([IAC, WILL, MCCP3, IAC, WILL, MCCP3]))
+    assert written[0] == bytes([IAC, DO, MCCP3])
+    assert len(written) == 2  # DO, then the start of compression.
+    telnet.receive(bytes([IAC, WILL, MCCP2, IAC, WILL, MCCP2]))
+    assert len(written) == 3
+    telnet.receive(bytes([IAC, WONT, MCCP3, IAC, WONT, MCCP3]))
+    assert written[-1] == bytes([IAC, DONT, MCCP3])
+    assert not telnet._compressor
+    assert len(written) == 5  # The end of compression, then DONT.
+
+
+def test_throughput():
+    results = {}
+    for compression in (False, True):
+        world = World(NullOutput())
+        factory, server, client = connect(world, compression=compression)
+        pump(server, client)
+        results[compression] = 0
+        for chunk in range(50):
+            factory.send_lines(100)
+            results[compression] += pump(server, client)
+        assert len(world.scrollback) == 5001
+    assert results[True] < results[False]
@@ -0,0 +1,95 @@
+"""Compare TriggerSet with trying every trigger in turn, as worlds did
+before triggers were indexed."""
+
+import random
+from muddle.line import Line
+from muddle.trigger_set import required_literal
+from muddle.triggers import Trigger
+
+patterns = [
+    ('hello', True),
+    (r'hello (\w+)', True),
+    (r"(\w+) tells you '(.*)'", True),
+    (r'.*hits you', True),
+    (r'You (see|hit) (\w+)', True),
+    (r'(?i)bob says', True),
+    (r'[a-z]+ arrives', True),
+    (r'(?:the )?orc', True),
+    (r'.*', True),
+    (r'^$', True),
+    ('the orc hits you', False),
+    ("Bob tells you 'hi'", False)
+]
+lines = [
+    'hello',
+    'hello bob',
+    "Bob tells you 'hi'",
+    'the orc hits you',
+    'BOB SAYS hi',
+    'You see bob',
+    'You hit the orc',
+    'a goblin arrives',
+    'orc',
+    ''
+]
+
+
+def act(thing, line):
+    """Do what the name of thing says to line."""
+    if thing.name == 'gag':
+        line.gag()
+    elif thing.name.startswith('sub:'):
+        line.substitute(thing.name[4:])
+
+
+def linear(things, line):
+    """Return the names of the things which match line, trying every one in
+    turn."""
+    names = []
+    for raw in (True, False):
+        for thing in things:
+            if thing.raw == raw and thing.match(line):
+                names.append(thing.name)
+                act(thing, line)
+    return names
+
+
+def indexed(world, line):
+    """Return the names of the things in world's trigger set which match
+    line."""
+    names = []
+    for thing, args, kwargs in world.trigger_set.matches(line):
+        names.append(thing.name)
+        act(thing, line)
+    return names
+
+
+def test_required_literal():
+    assert required_literal(r"(\w+) tells you '(.*)'") == " tells you '"
+    assert required_literal(r'.*hits you') == 'hits you'
+    assert required_literal(r'(?:abc)?def') == 'def'
+    assert required_literal(r'(?i)hits you') == ''
+    assert required_literal(rb'.*hits you') == b'hits you'
+
+
+def test_matches_like_linear(world):
+    generator = random.Random(1)
+    for trial in range(50):
+        world.clear_things()
+        things = []
+        for number in range(20):
+            pattern, regexp = generator.choice(patterns)
+            action = generator.choice(
+                ['none', 'none', 'gag', 'sub:' + generator.choice(lines)]
+            )
+            thing = Trigger(
+                world, name=action, pattern=pattern, regexp=regexp,
+                raw=generator.random() < 0.2
+            )
+            world.add(thing)
+            things.append(thing)
+        for text in lines:
+            expected = Line(text.encode())
+            got = Line(text.encode())
+            assert indexed(world, got) == linear(things, expected), text
+            assert got.get_text() == expected.get_text()
@@ -0,0 +1,30 @@
+"""Test triggers."""
+
+from twisted.internet.testing import StringTransport
+from muddle.line import Line
+from muddle.protocol import Protocol
+from muddle.triggers import Trigger
+
+
+def test_invalid_pattern_disables_trigger(world):
+    bad = Trigger(world, pattern='([')
+    good = Trigger(world, pattern='hello')
+    world.add(bad)
+    world.add(good)
+    matches = list(world.trigger_set.matches(Line(b'hello')))
+    assert [thing for thing, args, kwargs in matches] == [good]
+    assert world.triggers == [good]
+    assert world.disabled == [bad]
+
+
+def test_invalid_code_disables_trigger(world):
+    bad = Trigger(world, pattern='hello', code='this is not lua')
+    world.add(bad)
+    world.protocol = Protocol(world)
+    world.protocol.makeConnection(StringTransport())
+    world.protocol.dataReceived(b'hello\r\nworld\r\n')
+    assert world.disabled == [bad]
+    assert world.triggers == []
+    assert [text for timestamp, text in world.scrollback] == [
+        'hello', 'world'
+    ]
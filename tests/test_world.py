@@ -0,0 +1,73 @@
+"""Test worlds."""
+
+import logging
+from muddle.line import Line
+from muddle.headless import NullOutput
+from muddle.triggers import Trigger
+from muddle.world import World
+
+
+def test_duplicate_classes(world):
+    first = Trigger(world, pattern='first', classes=['q', 'q'])
+    second = Trigger(world, pattern='second', classes=['q'])
+    world.add(first)
+    world.add(second)
+    assert world.disabled == [first, second]
+    world.enable_class('q')
+    assert world.triggers == [first, second]
+    assert world.disabled == []
+    world.disable_class('q')
+    assert world.triggers == []
+    assert world.disabled == [first, second]
+
+
+def test_class_order(world):
+    things = [
+        Trigger(world, pattern=str(number), classes=['odd'] if number % 2
+                else [])
+        for number in range(6)
+    ]
+    for thing in things:
+        world.add(thing)
+    world.enable_class('odd')
+    assert world.triggers == things
+    world.disable_class('odd')
+    assert world.triggers == things[::2]
+
+
+def test_logging(world):
+    loggers = len(logging.root.manager.loggerDict)
+    other = World(NullOutput())
+    assert len(logging.root.manager.loggerDict) == loggers
+    world.logger.warning('Hello.')
+    assert world.frame.writes == 1
+    assert other.frame.writes == 0
+
+
+def test_disable_class_after_invalid_pattern(world):
+    bad = Trigger(world, pattern='([', classes=['combat'])
+    world.enable_class('combat')
+    world.add(bad)
+    assert not bad.match(Line('hello'))
+    assert world.disabled == [bad]
+    world.disable_class('combat')
+    assert world.disabled == [bad]
+    world.disable(bad)
+    assert world.disabled == [bad]
+
+
+def test_send_batches_thread_hops(world, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        'muddle.world.reactor.callFromThread',
+        lambda func, *args: calls.append((func, args))
+    )
+    for command in ('north', 'east', 'south'):
+        world.send(command)
+    assert len(calls) == 1
+    func, args = calls.pop()
+    func(*args)
+    assert list(world.send_queue.commands) == [b'north', b'east', b'south']
+    world.send_queue.cancel()
+    world.send('west')
+    assert len(calls) == 1